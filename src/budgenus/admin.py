@@ -5,8 +5,13 @@ from django.utils.html import format_html
 from django.db import transaction
 from django.core.exceptions import PermissionDenied
 from django.contrib import messages
-from tenants.models import Tenant, Domain, Invitation
-from users.models import CustomUser
+from tenants.models import Tenant, Domain, Invitation, TenantStats
+from users.models import CustomUser, Address
+from users.utils import address_hash
+from core.admin import AutocompleteFilter, EstimatedCountMixin, TrigramSearchMixin
+from django import forms
+from django.conf import settings
+from core.db.timeouts import get_timeout_counts
 
 # Create a custom admin site
 class BudgenusAdminSite(admin.AdminSite):
@@ -58,33 +63,62 @@ class InvitationInline(admin.TabularInline):
     def has_add_permission(self, request, obj=None):
         return False
 
-class TenantAdmin(admin.ModelAdmin):
+class TenantAdminForm(forms.ModelForm):
+    db_profile = forms.ChoiceField(label='Database profile')
+
+    class Meta:
+        model = Tenant
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['db_profile'].choices = [(name, name) for name in settings.TENANT_DB_PROFILES]
+        self.fields['db_profile'].help_text = Tenant._meta.get_field('db_profile').help_text
+
+class TenantAdmin(TrigramSearchMixin, EstimatedCountMixin, admin.ModelAdmin):
+    form = TenantAdminForm
     list_display = ['name', 'owner', 'created_at', 'paid_until', 'is_active', 'is_on_trial', 'tenant_admin_link', 'member_count']
     list_filter = ['created_at', 'paid_until', 'trial_end_date']
     search_fields = ['name', 'owner__email', 'users__email']
-    readonly_fields = ['created_at', 'tenant_admin_link', 'schema_name', 'member_count', 'is_active', 'is_on_trial']
+    readonly_fields = ['created_at', 'last_active_at', 'archiving_at', 'archived_at', 'tenant_admin_link', 'schema_name', 'database', 'db_timeouts', 'member_count', 'is_active', 'is_on_trial']
     inlines = [DomainInline, UserInline, InvitationInline]
     fieldsets = (
         ('Basic Information', {
-            'fields': ('name', 'owner', 'schema_name')
+            'fields': ('name', 'owner', 'schema_name', 'database')
         }),
         ('Subscription Details', {
             'fields': ('paid_until', 'trial_end_date')
         }),
+        ('Database Limits', {
+            'fields': ('db_profile', 'statement_timeout', 'lock_timeout', 'work_mem', 'db_timeouts')
+        }),
         ('Status', {
-            'fields': ('is_active', 'is_on_trial')
+            'fields': ('is_active', 'is_on_trial', 'archiving_at', 'archived_at')
         }),
         ('Admin Access', {
             'fields': ('tenant_admin_link',)
         }),
         ('Statistics', {
-            'fields': ('member_count', 'created_at')
+            'fields': ('member_count', 'created_at', 'last_active_at')
         })
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('stats')
+
     def member_count(self, obj):
-        return obj.users.count()
+        # From the TenantStats summary (refresh_tenant_stats); live count until it exists
+        try:
+            return obj.stats.member_count
+        except TenantStats.DoesNotExist:
+            return obj.users.count()
     member_count.short_description = "Total Members"
+    member_count.admin_order_field = 'stats__member_count'
+
+    def db_timeouts(self, obj):
+        counts = get_timeout_counts(obj.schema_name)
+        return ', '.join(f"{kind}: {count}" for kind, count in counts.items())
+    db_timeouts.short_description = "Timeouts hit"
 
     def tenant_admin_link(self, obj):
         if obj.tenant_domains.filter(is_primary=True).exists():
@@ -151,9 +185,9 @@ class TenantAdmin(admin.ModelAdmin):
                 messages.error(request, f"Error deleting tenant: {str(e)}")
                 raise
 
-class DomainAdmin(admin.ModelAdmin):
+class DomainAdmin(EstimatedCountMixin, admin.ModelAdmin):
     list_display = ['domain', 'tenant', 'is_primary', 'tenant_admin_link']
-    list_filter = ['is_primary', 'tenant']
+    list_filter = ['is_primary', ('tenant', AutocompleteFilter)]
     search_fields = ['domain', 'tenant__name']
     readonly_fields = ['tenant_admin_link']
 
@@ -170,11 +204,37 @@ class InvitationAdmin(admin.ModelAdmin):
     search_fields = ['email', 'tenant__name', 'invited_by__email']
     readonly_fields = ['created_at', 'expires_at']
 
-class CustomUserAdmin(admin.ModelAdmin):
+class AddressAdminForm(forms.ModelForm):
+    class Meta:
+        model = Address
+        fields = ['country', 'state', 'city', 'address_line1', 'address_line2', 'zip_code']
+
+    def clean(self):
+        """Refuse to create or edit an address into a copy of an existing one"""
+        cleaned_data = super().clean()
+        duplicate = Address.objects.filter(content_hash=address_hash(cleaned_data)).exclude(pk=self.instance.pk).first()
+        if duplicate is not None:
+            raise forms.ValidationError(f"An identical address already exists (#{duplicate.pk}).")
+        return cleaned_data
+
+class AddressAdmin(admin.ModelAdmin):
+    form = AddressAdminForm
+    list_display = ['address_line1', 'city', 'zip_code', 'country', 'updated_at']
+    search_fields = ['address_line1', 'city', 'zip_code']
+    readonly_fields = ['content_hash', 'updated_at']
+
+    def has_change_permission(self, request, obj=None):
+        # A row shared by several users (possibly of different tenants) would
+        # change for all of them; change their addresses through the API instead
+        if obj is not None and obj.users.count() > 1:
+            return False
+        return super().has_change_permission(request, obj)
+
+class CustomUserAdmin(TrigramSearchMixin, EstimatedCountMixin, admin.ModelAdmin):
     list_display = ['email', 'first_name', 'last_name', 'tenant', 'is_active', 'is_staff']
-    list_filter = ['is_active', 'is_staff', 'tenant']
+    list_filter = ['is_active', 'is_staff', ('tenant', AutocompleteFilter)]
     search_fields = ['email', 'first_name', 'last_name']
-    readonly_fields = ['date_joined', 'last_login']
+    readonly_fields = ['date_joined', 'last_login', 'last_seen_at']
     fieldsets = (
         ('Personal Info', {
             'fields': ('email', 'first_name', 'last_name', 'phone_number')
@@ -183,7 +243,7 @@ class CustomUserAdmin(admin.ModelAdmin):
             'fields': ('is_active', 'is_staff', 'is_superuser', 'tenant')
         }),
         ('Important dates', {
-            'fields': ('date_joined', 'last_login')
+            'fields': ('date_joined', 'last_login', 'last_seen_at')
         }),
     )
 
@@ -279,6 +339,7 @@ admin_site.register(Tenant, TenantAdmin)
 admin_site.register(Domain, DomainAdmin)
 admin_site.register(Invitation, InvitationAdmin)
 admin_site.register(CustomUser, CustomUserAdmin)
+admin_site.register(Address, AddressAdmin)
 admin_site.register(Group, BaseGroupAdmin)  # Register the Group model with the default GroupAdmin
 
 # Replace the default admin site
@@ -0,0 +1,55 @@
+"""
+Settings for API-only workers (DJANGO_SETTINGS_MODULE=budgenus.settings.api).
+
+Same as prod, minus everything the JWT APIs of users, tenants and core don't
+use: the admin and API docs URLs, sessions, messages, static files and their
+middleware (sessions, CSRF, authentication, messages, clickjacking, admin
+access). Route admin and docs traffic to workers running the prod settings.
+
+The admin app itself stays installed: admin.LogEntry has a foreign key to
+CustomUser, and a model missing from the registry is missing from delete
+cascades while its table still exists. Only drop apps whose models have no
+relations to the API's models.
+"""
+from .prod import *
+
+API_EXCLUDED_APPS = {
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'drf_spectacular',
+}
+# django_tenants syncs and routes migrations by SHARED_APPS / TENANT_APPS
+SHARED_APPS = [app for app in SHARED_APPS if app not in API_EXCLUDED_APPS]
+TENANT_APPS = [app for app in TENANT_APPS if app not in API_EXCLUDED_APPS]
+INSTALLED_APPS = list(SHARED_APPS) + [app for app in TENANT_APPS if app not in SHARED_APPS]
+
+API_EXCLUDED_MIDDLEWARE = {
+    'core.middleware.AdminAccessMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+}
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in API_EXCLUDED_MIDDLEWARE]
+
+# The admin is installed for its models only, its URLs are not served here
+SILENCED_SYSTEM_CHECKS = [
+    'admin.E406',  # django.contrib.messages
+    'admin.E408',  # AuthenticationMiddleware
+    'admin.E409',  # MessageMiddleware
+    'admin.E410',  # SessionMiddleware
+]
+
+ROOT_URLCONF = 'budgenus.urls_api'
+PUBLIC_SCHEMA_URLCONF = 'budgenus.urls_api_public'
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'core.authentication.LanguageJWTAuthentication',
+    ],
+}
+
+WARMUP_SCHEMA = False  # No docs endpoints on these workers
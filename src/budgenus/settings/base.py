@@ -75,15 +75,20 @@ LOCALE_PATHS = [BASE_DIR / 'locale']
 # Middleware - Order is important
 MIDDLEWARE = [
     'django_tenants.middleware.main.TenantMainMiddleware',  # Must be first
+    'core.middleware.TenantShardMiddleware',  # Routes queries to the tenant's shard
+    'core.middleware.RequestContextMiddleware',  # Tenant context / request id for background work
     'django.middleware.security.SecurityMiddleware',
-    'django.middleware.locale.LocaleMiddleware',
-    'core.middleware.LanguageMiddleware',  # Language handling
+    'core.middleware.LanguageMiddleware',  # Language negotiation
     'core.middleware.AdminAccessMiddleware',  # Admin access control
     'corsheaders.middleware.CorsMiddleware',
+    'core.middleware.ArchivedTenantMiddleware',  # Rehydrates archived tenants
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',  # Read replica routing
+    'core.middleware.ActivityTrackingMiddleware',  # Buffered last-seen tracking
+    'core.middleware.DatabaseTimeoutMiddleware',  # Counts tenant query timeouts
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -91,7 +96,7 @@ MIDDLEWARE = [
 # Database Configuration - Consider moving to dev.py
 DATABASES = {
     'default': {
-        'ENGINE': 'django_tenants.postgresql_backend',
+        'ENGINE': 'core.db.backend',  # django_tenants backend with tenant session settings
         'NAME': 'budgenus-postgres',
         'USER': 'budgenus',
         'PASSWORD': 'budgenus',
@@ -105,14 +110,71 @@ TENANT_MODEL = "tenants.Tenant"  # Model for tenant
 TENANT_DOMAIN_MODEL = "tenants.Domain"  # Model for tenant domains
 SHOW_PUBLIC_IF_NO_TENANT_FOUND = True   # Tell Django to use public schema if no tenant is found
 PUBLIC_SCHEMA_NAME = 'public'
+TENANT_LIMIT_SET_CALLS = True  # Only SET search_path when the tenant changes
 FORCE_SCRIPT_NAME = None
 APPEND_SLASH = True
 
+# Admin access (core.middleware.AdminAccessMiddleware): addresses or CIDR ranges
+ADMIN_URL_PREFIX = '/admin/'
+ADMIN_ALLOWED_IPS = ['127.0.0.1', '::1']
+ADMIN_TRUSTED_PROXIES = []  # Load balancers whose X-Forwarded-For is trusted
+
+# Admin changelists (core.admin.EstimatedCountPaginator) show PostgreSQL's
+# row estimate for unfiltered lists instead of running COUNT(*) from this
+# many rows on; filtered lists are always counted
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
 # Database Routing
 DATABASE_ROUTERS = (
+    'core.db.routers.ShardRouter',
+    'core.db.routers.ReplicaRouter',
     'django_tenants.routers.TenantSyncRouter',
 )
 
+# Read replicas - aliases in DATABASES using ENGINE 'core.db.backend'
+# with 'PRIMARY': 'default' so they follow the tenant's search_path
+DATABASE_REPLICAS = []
+REPLICA_ADMIN_CHANGELISTS = True  # Admin changelists may read from replicas
+REPLICA_PIN_COOKIE = 'db_pin'     # Keeps a client on the primary after a write
+REPLICA_PIN_SECONDS = 5           # Should exceed the usual replication lag
+
+# Tenant shards - aliases in DATABASES that may hold tenant schemas
+# (Tenant.database). Each shard needs the shared apps migrated.
+DATABASE_SHARDS = ['default']
+
+# API response cache (see core.cache.cached_response)
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300  # Seconds; writes invalidate entries earlier
+
+# Tenant/user activity tracking (see core.activity)
+ACTIVITY_TRACKING = True
+ACTIVITY_FLUSH_INTERVAL = 60  # Seconds between batched last-seen writes
+
+# Tenant statistics (see tenants.stats): rows older than this are recomputed
+# even if nothing flagged them, to catch trial/invitation expiry
+TENANT_STATS_MAX_AGE = 24 * 60 * 60  # Seconds
+
+# Threads of the per-process background pool (core.context.run_in_background)
+BACKGROUND_WORKERS = 4
+
+# PostgreSQL session settings per tenant plan (Tenant.db_profile), applied
+# with the tenant's search_path; Tenant fields can override single values.
+# They apply wherever a tenant is selected, including tenant_context() jobs
+# and management commands: long tenant jobs need a larger profile.
+TENANT_DB_PROFILES = {
+    'standard': {'statement_timeout': '15s', 'lock_timeout': '5s', 'work_mem': '4MB'},
+    'large': {'statement_timeout': '60s', 'lock_timeout': '10s', 'work_mem': '32MB'},
+    'unrestricted': {},
+}
+
+# Cold tenant archival (see tenants.archive)
+TENANT_ARCHIVE_DIR = BASE_DIR / 'archive'
+TENANT_ARCHIVE_AFTER_DAYS = 90       # Idle days before an inactive tenant is archived
+TENANT_REHYDRATE_RETRY_AFTER = 10    # Retry-After seconds of the "warming up" response
+TENANT_REHYDRATE_LOCK_SECONDS = 600  # Upper bound for a single restore
+TENANT_REHYDRATE_BACKOFF = 60        # Seconds before retrying a failed restore, doubled per failure
+TENANT_REHYDRATE_MAX_BACKOFF = 3600
+
 # Templates Configuration
 TEMPLATES = [
     {
@@ -155,7 +217,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.LanguageJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -193,6 +255,8 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 
     'JTI_CLAIM': 'jti',
+
+    'TOKEN_OBTAIN_SERIALIZER': 'users.api.serializers.CustomTokenObtainPairSerializer',
 }
 
 # Spectacular settings
@@ -203,6 +267,14 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# Prebuilt OpenAPI schemas (manage.py build_openapi_schema), served by
+# core.api.schema.SchemaView when present
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'openapi'
+
+# Worker warm-up (see core.warmup); gunicorn.conf.py runs it per worker
+WARMUP_ON_READY = False  # Warm up in CoreConfig.ready (single-process servers)
+WARMUP_SCHEMA = True     # Include the OpenAPI schema (the slowest step)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React frontend
@@ -40,7 +40,7 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # Print emails
 REST_FRAMEWORK = {
     **REST_FRAMEWORK,  # Get base settings
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.LanguageJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',  # Add session auth for development
     ],
     'DEFAULT_RENDERER_CLASSES': [
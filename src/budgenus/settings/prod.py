@@ -26,16 +26,48 @@ X_FRAME_OPTIONS = 'DENY'
 # Database Configuration
 DATABASES = {
    'default': {
-       'ENGINE': 'django_tenants.postgresql_backend',
+       'ENGINE': 'core.db.backend',  # django_tenants backend with pooling
        'NAME': os.environ.get('DB_NAME'),
        'USER': os.environ.get('DB_USER'),
        'PASSWORD': os.environ.get('DB_PASSWORD'),
        'HOST': os.environ.get('DB_HOST'),
        'PORT': os.environ.get('DB_PORT', '5432'),
-       'CONN_MAX_AGE': 60,  # 1 minute connection persistence
+       'CONN_MAX_AGE': 0,  # Connections go back to the pool after each request
+       'POOL': {
+           'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+           'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),  # Per worker process
+           'TIMEOUT': 5,           # Seconds to wait for a free connection
+           'MAX_LIFETIME': 1800,   # Recycle connections after 30 minutes
+           'MAX_IDLE': 600,        # Close idle connections above MIN_SIZE
+           'CHECK_INTERVAL': 30,   # Health check connections idle longer than this
+       },
    }
 }
 
+# Read replicas (comma separated hosts, same credentials as the primary)
+DATABASE_REPLICAS = []
+for index, host in enumerate(h.strip() for h in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if h.strip()):
+   alias = f'replica_{index + 1}'
+   DATABASES[alias] = {
+       **DATABASES['default'],
+       'ENGINE': 'core.db.backend',
+       'HOST': host,
+       'PRIMARY': 'default',
+       'TEST': {'MIRROR': 'default'},
+   }
+   DATABASE_REPLICAS.append(alias)
+
+# Tenant shards (comma separated alias=host pairs, same credentials as the primary)
+DATABASE_SHARDS = ['default']
+for entry in (e.strip() for e in os.environ.get('DB_SHARD_HOSTS', '').split(',') if e.strip()):
+   alias, host = entry.split('=', 1)
+   DATABASES[alias] = {**DATABASES['default'], 'HOST': host}
+   DATABASE_SHARDS.append(alias)
+
+# Admin allowlist and load balancers (comma separated addresses or CIDR ranges)
+ADMIN_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('ADMIN_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+ADMIN_TRUSTED_PROXIES = [ip.strip() for ip in os.environ.get('ADMIN_TRUSTED_PROXIES', '').split(',') if ip.strip()]
+
 # Cache Configuration (using Redis)
 CACHES = {
    'default': {
@@ -47,6 +79,9 @@ CACHES = {
    }
 }
 
+# Tenant archives should live on persistent storage
+TENANT_ARCHIVE_DIR = os.environ.get('TENANT_ARCHIVE_DIR', '/var/lib/budgenus/archive')
+
 # Email Configuration (using SMTP)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ.get('EMAIL_HOST')
@@ -66,7 +101,15 @@ MEDIA_ROOT = BASE_DIR / 'mediafiles'
 # You can override specific settings if needed
 REST_FRAMEWORK = {
     **REST_FRAMEWORK,  # Get base settings
-    # Add any production-specific overrides here
+    # orjson-backed JSON, falls back to the stdlib encoder if orjson is missing
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.api.renderers.FastJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 # Production CORS settings
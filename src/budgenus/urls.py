@@ -1,10 +1,10 @@
 """
 URL configuration for budgenus project.
 """
-from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from django.contrib import admin
+from core.lazy import lazy_view
 
 # Main URLs - these will be available in both public and tenant schemas
 urlpatterns = [
@@ -12,9 +12,9 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     
     # API Documentation
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path('api/schema/', lazy_view('core.api.schema.SchemaView'), name='schema'),
+    path('api/docs/', lazy_view('drf_spectacular.views.SpectacularSwaggerView', url_name='schema'), name='swagger-ui'),
+    path('api/redoc/', lazy_view('drf_spectacular.views.SpectacularRedocView', url_name='schema'), name='redoc'),
     
     # Authentication URLs (available in both public and tenant)
     path('api-auth/', include('rest_framework.urls')),
@@ -25,7 +25,6 @@ urlpatterns = [
 
 # Debug toolbar only in development
 if settings.DEBUG:
-    import debug_toolbar
     urlpatterns = [
-        path('__debug__/', include(debug_toolbar.urls)),
+        path('__debug__/', include('debug_toolbar.urls')),
     ] + urlpatterns
@@ -0,0 +1,10 @@
+"""
+Tenant URLs of API-only workers (settings.api): budgenus.urls without the
+admin, API docs, browsable API login and debug toolbar.
+"""
+from django.urls import path, include
+
+urlpatterns = [
+    # Tenant management URLs
+    path('', include('tenants.urls')),
+]
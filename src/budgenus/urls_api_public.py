@@ -0,0 +1,10 @@
+"""
+Public URLs of API-only workers (settings.api): budgenus.urls_public without
+the admin, API docs, browsable API login and debug toolbar.
+"""
+from django.urls import path, include
+
+urlpatterns = [
+    # Public API endpoints
+    path('api/auth/', include('users.api.urls')),  # Authentication endpoints
+]
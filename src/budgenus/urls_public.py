@@ -1,7 +1,7 @@
 # src/budgenus/urls_public.py
 from django.urls import path, include
 from django.conf import settings
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from core.lazy import lazy_view
 from budgenus.admin import admin_site  # Import our custom admin site
 
 # Public URLs (non-tenant specific)
@@ -13,9 +13,9 @@ urlpatterns = [
     path('api/auth/', include('users.api.urls')),  # Authentication endpoints
     
     # API Documentation
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path('api/schema/', lazy_view('core.api.schema.SchemaView'), name='schema'),
+    path('api/docs/', lazy_view('drf_spectacular.views.SpectacularSwaggerView', url_name='schema'), name='swagger-ui'),
+    path('api/redoc/', lazy_view('drf_spectacular.views.SpectacularRedocView', url_name='schema'), name='redoc'),
     
     # DRF browsable API authentication
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
@@ -23,7 +23,6 @@ urlpatterns = [
 
 # Debug toolbar in development
 if settings.DEBUG:
-    import debug_toolbar
     urlpatterns = [
-        path('__debug__/', include(debug_toolbar.urls)),
+        path('__debug__/', include('debug_toolbar.urls')),
     ] + urlpatterns
\ No newline at end of file
@@ -0,0 +1,112 @@
+import atexit
+import logging
+import os
+import threading
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Case, DateTimeField, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from django_tenants.utils import get_public_schema_name, schema_context
+from .db.routers import shard_scope
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def _touch_rows(model, field, stamps):
+    """
+    Set `field` to the buffered timestamps, never moving it backwards (other
+    workers may have flushed a later one). One UPDATE per batch.
+    """
+    items = list(stamps.items())
+    for start in range(0, len(items), BATCH_SIZE):
+        batch = dict(items[start:start + BATCH_SIZE])
+        seen = Case(*[When(pk=pk, then=Value(stamp)) for pk, stamp in batch.items()], output_field=DateTimeField())
+        model.objects.filter(pk__in=batch).update(**{field: Greatest(Coalesce(field, seen), seen)})
+
+
+class ActivityBuffer:
+    """
+    Write-behind buffer of "last seen" timestamps.
+
+    Requests only record timestamps in memory; a daemon thread flushes them
+    every ACTIVITY_FLUSH_INTERVAL seconds with batched UPDATEs to
+    Tenant.last_active_at (public schema) and CustomUser.last_seen_at (in the
+    schema and shard the user was seen in). Repeated hits between flushes collapse into
+    one write.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self._tenants = {}  # tenant id -> datetime
+        self._users = {}    # (database alias, schema name, user id) -> datetime
+        self._thread = None
+        self._stop = threading.Event()
+
+    def touch(self, tenant=None, user=None):
+        now = timezone.now()
+        with self._lock:
+            if self.pid != os.getpid():
+                # Forked worker: the parent's buffer and thread aren't ours
+                self._reset()
+            if tenant is not None:
+                self._tenants[tenant.pk] = now
+            if user is not None and tenant is not None:
+                self._users[(tenant.database, tenant.schema_name, user.pk)] = now
+            elif user is not None:
+                self._users[(DEFAULT_DB_ALIAS, get_public_schema_name(), user.pk)] = now
+            if self._thread is None:
+                self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='activity-flush', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(settings.ACTIVITY_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        """Write and clear everything buffered so far"""
+        with self._lock:
+            tenants, self._tenants = self._tenants, {}
+            users, self._users = self._users, {}
+        if not tenants and not users:
+            return
+
+        from tenants.models import Tenant
+        from users.models import CustomUser
+
+        users_by_schema = {}
+        for (alias, schema_name, user_id), stamp in users.items():
+            users_by_schema.setdefault((alias, schema_name), {})[user_id] = stamp
+        try:
+            with schema_context(get_public_schema_name()):
+                _touch_rows(Tenant, 'last_active_at', tenants)
+            for (alias, schema_name), stamps in users_by_schema.items():
+                with shard_scope(alias) as shard_connection:
+                    shard_connection.set_schema(schema_name)
+                    try:
+                        _touch_rows(CustomUser, 'last_seen_at', stamps)
+                    finally:
+                        shard_connection.set_schema_to_public()
+        except Exception:
+            logger.exception("Failed to flush activity for %d tenants and %d users", len(tenants), len(users))
+        finally:
+            if threading.current_thread() is self._thread:
+                for alias in {DEFAULT_DB_ALIAS, *(alias for alias, _ in users_by_schema)}:
+                    connections[alias].close()
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+
+activity_buffer = ActivityBuffer()
+atexit.register(activity_buffer.stop)
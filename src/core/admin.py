@@ -1,5 +1,194 @@
+import functools
+import operator
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.text import smart_split, unescape_string_literal
+from django.utils.translation import gettext as _
 
 
-# Register your models here.
+class TrigramSearchMixin:
+    """
+    ModelAdmin search that stays on indexes and never needs DISTINCT.
 
+    Plain search fields are matched as usual (icontains, or `^` istartswith /
+    `=` iexact), which the trigram indexes of core.db.indexes.trigram_index
+    serve. A field across a relation (`users__email`) is matched in a
+    subquery on the related table instead of a join, so it can use that
+    table's index and a tenant with many matching users is returned once.
+    """
+
+    lookup_prefixes = {'^': 'istartswith', '=': 'iexact'}
+
+    def _search_condition(self, model, search_field, term):
+        lookup = self.lookup_prefixes.get(search_field[0])
+        if lookup is not None:
+            search_field = search_field[1:]
+        lookup = lookup or 'icontains'
+
+        name, _, rest = search_field.partition('__')
+        if not rest:
+            return Q(**{f'{name}__{lookup}': term})
+        field = model._meta.get_field(name)
+        matches = field.related_model._default_manager.filter(**{f'{rest}__{lookup}': term})
+        if field.many_to_one or (field.one_to_one and field.concrete):
+            # Forward foreign key: tenant.owner_id IN (matching users)
+            return Q(**{f'{field.attname}__in': matches.values(field.target_field.attname)})
+        if field.one_to_many or field.one_to_one:
+            # Reverse foreign key: tenant.id IN (tenant_id of matching users)
+            return Q(**{f'{field.field.target_field.attname}__in': matches.values(field.field.attname)})
+        # Many-to-many: let the ORM join, inside the subquery
+        return Q(pk__in=model._default_manager.filter(**{f'{search_field}__{lookup}': term}).values('pk'))
+
+    def get_search_results(self, request, queryset, search_term):
+        search_fields = self.get_search_fields(request)
+        if not search_fields or not search_term:
+            return queryset, False
+        term_conditions = []
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            term_conditions.append(functools.reduce(operator.or_, (
+                self._search_condition(queryset.model, str(field), bit) for field in search_fields
+            )))
+        return queryset.filter(*term_conditions), False
+
+
+def estimated_count(queryset):
+    """
+    PostgreSQL's estimate of queryset.count() for an unfiltered queryset (the
+    table's reltuples), or None. Filtered querysets get None: the planner's
+    row estimate for a WHERE clause can be off by orders of magnitude.
+    """
+    connection = connections[queryset.db]
+    query = queryset.query
+    if connection.vendor != 'postgresql' or query.where or query.distinct or query.is_sliced:
+        return None
+    with connection.cursor() as cursor:
+        # to_regclass() resolves the table in the current search_path (tenant schema)
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)',
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # -1 until the table is first vacuumed/analyzed
+    return int(row[0]) if row is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator using estimated_count() instead of COUNT(*) for unfiltered
+    querysets whose estimate reaches ADMIN_ESTIMATED_COUNT_THRESHOLD rows;
+    filtered and smaller results are counted exactly. Page numbers past the
+    real end just show an empty page.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is None or estimate < settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+
+class LookaheadPage(Page):
+    def __init__(self, object_list, number, paginator, more):
+        super().__init__(object_list, number, paginator)
+        self.more = more
+
+    def has_next(self):
+        return self.more
+
+
+class LookaheadPaginator(Paginator):
+    """
+    Paginator that never counts: each page fetches one extra row to know
+    whether another page follows. For "load more" lists such as the admin
+    autocomplete, which only needs has_next().
+    """
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        return LookaheadPage(rows[:self.per_page], number, self, more=len(rows) > self.per_page)
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """
+    Foreign key filter rendered as an autocomplete select searching the
+    related model's admin, instead of listing every related object in the
+    sidebar: only the selected object is loaded. The admin needs the
+    AutocompleteSelect media (see EstimatedCountMixin).
+    """
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.admin_site = model_admin.admin_site
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    def widget(self):
+        form_field = forms.ModelChoiceField(
+            queryset=self.field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(self.field, self.admin_site, attrs={'style': 'width: 100%'}),
+            required=False,
+        )
+        return form_field.widget.render(self.lookup_kwarg, self.lookup_val[-1] if self.lookup_val else None)
+
+    def choices(self, changelist):
+        yield {
+            'selected': not self.lookup_val and not self.lookup_val_isnull,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+            'display': _('All'),
+        }
+
+
+class EstimatedCountMixin:
+    """
+    ModelAdmin changelist without exact counts on large tables: paginates
+    with EstimatedCountPaginator (LookaheadPaginator for the autocomplete
+    view), skips the unfiltered total and facet counts, and loads the media
+    of AutocompleteFilter list filters.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        # The autocomplete view only needs to know whether more results follow
+        if request.resolver_match is not None and request.resolver_match.url_name == 'autocomplete':
+            return LookaheadPaginator(queryset, per_page, orphans, allow_empty_first_page)
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, (list, tuple)) and issubclass(list_filter[1], AutocompleteFilter):
+                field = self.model._meta.get_field(list_filter[0])
+                media += AutocompleteSelect(field, self.admin_site).media
+                media += forms.Media(js=['admin/js/jquery.init.js', 'core/js/autocomplete_filter.js'])
+                break
+        return media
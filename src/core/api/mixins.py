@@ -0,0 +1,103 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+from django.utils.translation import get_language
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET support for list and retrieve actions.
+
+    The validators come from a single aggregate query over the filtered
+    queryset: latest `last_modified_field` and row count, plus the same for
+    each relation in `related_validators` (nested or flattened data such as a
+    user's address), so a matching If-None-Match is answered with 304 before
+    anything is paginated or serialized.
+
+    A deleted row moves no timestamp, only the counts in the ETag. Last-Modified
+    is therefore only sent by retrieve, and only without related validators.
+    """
+    last_modified_field = 'updated_at'
+    related_validators = ()
+
+    def get_validator_stats(self, queryset):
+        """Latest change and row count of the queryset and of each related validator"""
+        field = self.last_modified_field
+        aggregates = {'count': Count('pk', distinct=True), 'last_modified': Max(field)}
+        for path in self.related_validators:
+            aggregates[f'{path}__count'] = Count(path, distinct=True)
+            aggregates[f'{path}__last_modified'] = Max(f'{path}__{field}')
+        return queryset.order_by().aggregate(**aggregates)
+
+    def get_etag(self, request, stats):
+        """
+        ETag of a representation. Also varies with the query string, the
+        language and the current date (serializers expose day counters such as
+        trial_days_remaining).
+        """
+        values = '|'.join(
+            f'{name}={value.isoformat() if hasattr(value, "isoformat") else value}'
+            for name, value in sorted(stats.items())
+        )
+        key = f'{request.get_full_path()}|{get_language()}|{timezone.now().date()}|{values}'
+        return quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+
+    def conditional_response(self, request, etag, last_modified=None):
+        """304 response, or None when the representation has to be sent"""
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+    def set_validators(self, response, etag, last_modified=None):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+        patch_vary_headers(response, ('Authorization', 'Accept-Language'))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = self.get_etag(request, self.get_validator_stats(queryset))
+        not_modified = self.conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        response = super().list(request, *args, **kwargs)
+        return self.set_validators(response, etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        if self.related_validators:
+            stats = self.get_validator_stats(self.get_queryset().filter(pk=instance.pk))
+            last_modified = None
+        else:
+            last_modified = getattr(instance, self.last_modified_field)
+            stats = {'count': 1, 'last_modified': last_modified}
+        etag = self.get_etag(request, stats)
+        not_modified = self.conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        serializer = self.get_serializer(instance)
+        return self.set_validators(Response(serializer.data), etag, last_modified)
+
+
+class RowListMixin:
+    """
+    List action that fetches rows with `.values()` and serializes them with
+    `row_serializer_class` (a core.api.rows.RowSerializer) instead of
+    instantiating a DRF serializer per object.
+    """
+    row_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.row_serializer_class is None:
+            return super().list(request, *args, **kwargs)
+
+        row_serializer = self.row_serializer_class(request)
+        queryset = self.filter_queryset(self.get_queryset()).values(*row_serializer.fields)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.serialize(page))
+        return Response(row_serializer.serialize(queryset))
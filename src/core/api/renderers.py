@@ -0,0 +1,46 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson, falling back to DRF's stdlib renderer
+    when orjson isn't installed, indented or ASCII-only output was requested,
+    or orjson can't encode the data (integers wider than 64 bits).
+
+    orjson serializes dicts, lists, strings, numbers and UUIDs natively.
+    Everything else (datetimes, decimals, lazy translation strings, ...) goes
+    through DRF's JSONEncoder.default, like in the stock renderer. The output
+    is the same JSON with two exceptions:
+    - NaN and Infinity render as null; the stock renderer raises with
+      STRICT_JSON (the default) and writes invalid JSON without it.
+    - Float exponents are written without '+' (1e16, not 1e+16).
+    """
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        if self.ensure_ascii or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self._encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            # Big integers, or a type the encoder rejects (which raises again here)
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer so the output stays a javascript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,45 @@
+from django.utils import timezone
+
+
+def format_datetime(value, tz):
+    """Same output as DRF's DateTimeField with the default ISO 8601 format"""
+    if value is None:
+        return None
+    value = value.astimezone(tz).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def format_date(value):
+    return value.isoformat() if value is not None else None
+
+
+class RowSerializer:
+    """
+    Read-only serializer for `.values()` rows.
+
+    Subclasses list the lookups to fetch in `fields` and implement
+    `to_representation(row)`. The clock and timezone are read once per
+    instance, and `prefetch(rows)` can load related data for a whole page in
+    one query. Output must match the equivalent ModelSerializer.
+    """
+    fields = ()
+
+    def __init__(self, request=None):
+        self.request = request
+        self.now = timezone.now()
+        self.today = self.now.date()
+        self.tz = timezone.get_current_timezone()
+
+    def prefetch(self, rows):
+        pass
+
+    def to_representation(self, row):
+        raise NotImplementedError('`to_representation()` must be implemented.')
+
+    def serialize(self, rows):
+        rows = list(rows)
+        self.prefetch(rows)
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
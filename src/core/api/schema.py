@@ -0,0 +1,108 @@
+import functools
+import hashlib
+import os
+from pathlib import Path
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from django.utils.translation import get_language, override
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.response import Response
+
+# Schema variant -> setting naming its urlconf. Public-schema requests are
+# routed with PUBLIC_SCHEMA_URLCONF by django_tenants, tenants with ROOT_URLCONF.
+SCHEMA_VARIANTS = {
+    'public': 'PUBLIC_SCHEMA_URLCONF',
+    'tenant': 'ROOT_URLCONF',
+}
+SCHEMA_FORMATS = ('json', 'yaml')
+
+
+def schema_urlconf(variant):
+    return getattr(settings, SCHEMA_VARIANTS[variant])
+
+
+def request_variant(request):
+    if getattr(request, 'urlconf', None) == settings.PUBLIC_SCHEMA_URLCONF:
+        return 'public'
+    return 'tenant'
+
+
+def generate_schema(variant, language):
+    generator = SchemaGenerator(urlconf=schema_urlconf(variant))
+    with override(language):
+        return generator.get_schema(request=None, public=True)
+
+
+@functools.lru_cache(maxsize=None)
+def get_schema(variant, language):
+    """OpenAPI schema of a variant, generated once per process and language"""
+    return generate_schema(variant, language)
+
+
+def schema_file_path(variant, language, fmt, version=None):
+    """Where build_openapi_schema writes a schema: <dir>/<version>/<variant>.<language>.<fmt>"""
+    version = version or spectacular_settings.VERSION
+    return Path(settings.OPENAPI_SCHEMA_DIR) / version / f'{variant}.{language}.{fmt}'
+
+
+@functools.lru_cache(maxsize=64)
+def _read_schema_file(path, mtime_ns):
+    content = Path(path).read_bytes()
+    return content, quote_etag(hashlib.md5(content, usedforsecurity=False).hexdigest())
+
+
+def load_schema_file(variant, language, fmt):
+    """(content, etag) of a prebuilt schema file, or None if it wasn't built"""
+    path = schema_file_path(variant, language, fmt)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    # Keyed by mtime so a rebuild is picked up without a restart
+    return _read_schema_file(str(path), mtime_ns)
+
+
+def preload_schemas(language):
+    """Load the prebuilt schema files, generating the variants that weren't built"""
+    for variant in SCHEMA_VARIANTS:
+        if load_schema_file(variant, language, 'json') is None:
+            get_schema(variant, language)
+        else:
+            load_schema_file(variant, language, 'yaml')
+
+
+class SchemaView(SpectacularAPIView):
+    """
+    SpectacularAPIView serving the schema of the requesting urlconf.
+
+    Prebuilt files (manage.py build_openapi_schema) are served as is with an
+    ETag; without them the schema is generated once per process. Versioned
+    requests are still generated on demand.
+    """
+
+    def _get_schema_response(self, request):
+        version = self.api_version or request.version or self._get_version_parameter(request)
+        if version:
+            return super()._get_schema_response(request)
+
+        variant, language = request_variant(request), get_language()
+        renderer = self.perform_content_negotiation(request, force=True)[0]
+        prebuilt = load_schema_file(variant, language, renderer.format)
+        if prebuilt is None:
+            return Response(
+                data=get_schema(variant, language),
+                headers={"Content-Disposition": f'inline; filename="{self._get_filename(request, None)}"'}
+            )
+
+        content, etag = prebuilt
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type=renderer.media_type)
+            response['Content-Disposition'] = f'inline; filename="{self._get_filename(request, None)}"'
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept', 'Accept-Language'))
+        return response
@@ -2,8 +2,10 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.conf import settings
 from django.utils.translation import activate, gettext as _
+from core.cache import cached_response
 
 class LanguageView(APIView):
+    @cached_response()
     def get(self, request):
         """Get available languages and current language"""
         current_language = request.LANGUAGE_CODE
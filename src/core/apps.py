@@ -15,3 +15,8 @@ class CoreConfig(AppConfig):
             import core.signals  # noqa
         except ImportError:
             pass
+
+        from django.conf import settings
+        if settings.WARMUP_ON_READY:
+            from core.warmup import warm_up
+            warm_up()
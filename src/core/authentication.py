@@ -0,0 +1,21 @@
+from django.utils import translation
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .utils import supported_languages
+
+
+class LanguageJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that switches the request to the user's preferred
+    language. The user row is loaded anyway, so its current preference wins;
+    the token's `preferred_language` claim is only a fallback.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            user, token = result
+            language = getattr(user, 'preferred_language', None) or token.get('preferred_language')
+            if language in supported_languages():
+                translation.activate(language)
+                request._request.LANGUAGE_CODE = language
+        return result
@@ -0,0 +1,156 @@
+import functools
+import hashlib
+import json
+import uuid
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, router, transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe, quote_etag
+from django.utils.translation import get_language
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+# Models whose writes never affect cached API responses
+IGNORED_MODELS = {
+    'admin.LogEntry',
+    'sessions.Session',
+    'contenttypes.ContentType',
+    'token_blacklist.OutstandingToken',
+    'token_blacklist.BlacklistedToken',
+    'tenants.TenantStats',
+}
+
+# Saves limited to these fields never affect cached API responses either
+# (last_login is saved on every login when SIMPLE_JWT['UPDATE_LAST_LOGIN'] is on)
+IGNORED_UPDATES = {
+    'users.CustomUser': {'last_login'},
+}
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _generation_key(label):
+    # Every schema has its own tables, so a write only invalidates its own schema
+    return f'resp-gen:{connection.schema_name}:{label}'
+
+
+def _model_label(model):
+    return model if isinstance(model, str) else model._meta.label
+
+
+def get_generations(labels):
+    """
+    Current generation token of each model label in the current schema.
+
+    Every write to a model replaces its token, which changes the key of every
+    cached response that depends on it. Missing tokens are created rather than
+    defaulted so an evicted token can never resurrect an old entry.
+    """
+    cache = get_cache()
+    keys = [_generation_key(label) for label in labels]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, uuid.uuid4().hex, None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def invalidate_models(*models, using=None):
+    """
+    Invalidate the current schema's cached responses depending on the given
+    models or labels.
+
+    Inside a transaction the tokens are replaced once it commits: replaced
+    earlier, a concurrent read could cache the pre-commit data under the new
+    generation. `using` is the alias the write went to (by default the one
+    the router picks for writes to the first model).
+    """
+    keys = [_generation_key(_model_label(model)) for model in models]
+    if using is None:
+        model = models[0]
+        using = router.db_for_write(apps.get_model(model) if isinstance(model, str) else model)
+
+    def invalidate():
+        get_cache().set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(invalidate, using=using)
+    else:
+        invalidate()
+
+
+def build_cache_key(request, labels):
+    """Key a response by schema, user, language, path, query params and model generations"""
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else 'anon'
+    query = sorted(request.GET.lists())
+    fingerprint = json.dumps([request.path, query, get_generations(labels)], separators=(',', ':'))
+    digest = hashlib.md5(fingerprint.encode(), usedforsecurity=False).hexdigest()
+    return f'resp:{connection.schema_name}:{user_id}:{get_language()}:{digest}'
+
+
+def compute_etag(data):
+    content = json.dumps(data, cls=JSONEncoder, sort_keys=True, separators=(',', ':'))
+    return quote_etag(hashlib.md5(content.encode(), usedforsecurity=False).hexdigest())
+
+
+def cached_response(models=(), timeout=None):
+    """
+    Cache the data of a read-only DRF handler.
+
+    Usage::
+
+        @cached_response(models=[Tenant, Domain])
+        def list(self, request, *args, **kwargs):
+            return super().list(request, *args, **kwargs)
+
+    `models` lists the models (or 'app.Model' labels) the response is built
+    from; any write to one of them invalidates the entry. Responses carry an
+    ETag and a matching If-None-Match yields a 304 without touching the view.
+    When the handler sets its own validators (core.api.mixins.ConditionalGetMixin)
+    those are stored and replayed on hits, so a representation has a single
+    ETag whether it comes from the cache or not.
+    """
+    labels = sorted({_model_label(model) for model in models})
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            cache = get_cache()
+            key = build_cache_key(request, labels)
+            cached = cache.get(key)
+            if cached is None:
+                response = handler(self, request, *args, **kwargs)
+                if response.status_code != 200 or not isinstance(response, Response):
+                    return response
+                cached = {
+                    'data': response.data,
+                    'etag': response.get('ETag') or compute_etag(response.data),
+                    'last_modified': response.get('Last-Modified'),
+                }
+                cache.set(key, cached, timeout if timeout is not None else settings.RESPONSE_CACHE_TIMEOUT)
+            else:
+                response = None
+
+            last_modified = cached.get('last_modified')
+            not_modified = get_conditional_response(
+                request,
+                etag=cached['etag'],
+                last_modified=parse_http_date_safe(last_modified) if last_modified else None,
+            )
+            if not_modified is not None:
+                return not_modified
+            if response is None:
+                response = Response(cached['data'])
+            response['ETag'] = cached['etag']
+            if last_modified:
+                response['Last-Modified'] = last_modified
+            patch_vary_headers(response, ('Authorization', 'Accept-Language'))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,290 @@
+"""
+Tenant execution context for code running outside the request/response cycle.
+
+A TenantContext (tenant, language, urlconf, request id) lives in a
+ContextVar. `tenant_context` enters one: it selects the tenant on the
+connection of the tenant's shard, activates the language and makes the
+context visible to `capture()`. Database connections are per thread, so work
+handed to other threads or processes must re-enter the context there:
+
+- threads: `bind(fn)` / `submit(executor, fn, ...)` / `run_in_background(fn, ...)`
+- asyncio: `async with tenant_context(...)` and `tenant_sync_to_async(fn)`
+- process pools: `TenantTask(fn, ...)`, a picklable callable
+"""
+import atexit
+import contextlib
+import functools
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextvars import ContextVar
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.urls import get_urlconf, set_urlconf
+from django.utils import translation
+from django_tenants.utils import get_public_schema_name, get_tenant_model, schema_context
+from .db.routers import shard_scope
+
+logger = logging.getLogger(__name__)
+
+
+class TenantContext:
+    """What a unit of work needs to run as a tenant. `tenant` is None for the public schema"""
+    __slots__ = ('tenant', 'language', 'urlconf', 'request_id')
+
+    def __init__(self, tenant=None, language=None, urlconf=None, request_id=None):
+        self.tenant = tenant
+        self.language = language
+        self.urlconf = urlconf
+        self.request_id = request_id
+
+    @property
+    def schema_name(self):
+        return self.tenant.schema_name if self.tenant is not None else get_public_schema_name()
+
+    def __repr__(self):
+        return f'<TenantContext {self.schema_name} {self.language} {self.request_id}>'
+
+
+_current = ContextVar('tenant_context', default=None)
+
+
+def new_request_id():
+    return uuid.uuid4().hex
+
+
+def get_tenant(schema_name):
+    """Tenant with this schema name, read from the public schema (None for public)"""
+    if schema_name == get_public_schema_name():
+        return None
+    with schema_context(get_public_schema_name()):
+        return get_tenant_model().objects.get(schema_name=schema_name)
+
+
+def get_current_context():
+    return _current.get()
+
+
+def get_request_id():
+    context = _current.get()
+    return context.request_id if context is not None else None
+
+
+def capture():
+    """Snapshot of the current context, to hand over to another thread, task or process"""
+    context = _current.get()
+    tenant = context.tenant if context is not None else getattr(connection, 'tenant', None)
+    if tenant is not None and (
+        not isinstance(tenant, get_tenant_model()) or tenant.schema_name == get_public_schema_name()
+    ):
+        # FakeTenant set by set_schema(); resolve the real one
+        tenant = get_tenant(tenant.schema_name)
+    return TenantContext(
+        tenant=tenant,
+        language=translation.get_language(),
+        urlconf=get_urlconf(),
+        request_id=context.request_id if context is not None else new_request_id(),
+    )
+
+
+class tenant_context(contextlib.ContextDecorator):
+    """
+    Run code as a tenant::
+
+        with tenant_context(tenant, language='fr'):
+            ...
+
+        @tenant_context(schema_name='acme')
+        def sweep():
+            ...
+
+    `tenant` may be a Tenant, a TenantContext or None with `schema_name`.
+    The previous tenant, language and urlconf are restored on exit. Queries
+    run under the tenant's database session settings (TENANT_DB_PROFILES,
+    e.g. the 15s statement_timeout of 'standard'), as in requests. Used with
+    `async with`, only the context variables are set: run database code
+    through tenant_sync_to_async().
+    """
+
+    def __init__(self, tenant=None, *, schema_name=None, language=None, request_id=None):
+        self.tenant = tenant
+        self.schema_name = schema_name
+        self.language = language
+        self.request_id = request_id
+
+    def _recreate_cm(self):
+        # A fresh instance per decorated call: enter state is kept on self
+        return type(self)(self.tenant, schema_name=self.schema_name,
+                          language=self.language, request_id=self.request_id)
+
+    def _context(self):
+        if isinstance(self.tenant, TenantContext):
+            return self.tenant
+        tenant = self.tenant
+        if tenant is None and self.schema_name is not None:
+            tenant = get_tenant(self.schema_name)
+        parent = _current.get()
+        return TenantContext(
+            tenant=tenant,
+            language=self.language,
+            urlconf=settings.PUBLIC_SCHEMA_URLCONF if tenant is None else settings.ROOT_URLCONF,
+            request_id=self.request_id or (parent.request_id if parent is not None else new_request_id()),
+        )
+
+    def _enter_context(self, context):
+        self._token = _current.set(context)
+        self._language = translation.override(context.language) if context.language else None
+        if self._language is not None:
+            self._language.__enter__()
+
+    def _exit_context(self, exc_type, exc_value, traceback):
+        if self._language is not None:
+            self._language.__exit__(exc_type, exc_value, traceback)
+        _current.reset(self._token)
+
+    def __enter__(self):
+        context = self._context()
+        alias = getattr(context.tenant, 'database', DEFAULT_DB_ALIAS)
+        self._connection = connections[alias]
+        self._previous_tenant = self._connection.tenant
+        self._previous_urlconf = get_urlconf()
+        if context.tenant is None:
+            self._connection.set_schema_to_public()
+        else:
+            self._connection.set_tenant(context.tenant)
+        set_urlconf(context.urlconf)
+        self._shard = shard_scope(alias)
+        self._shard.__enter__()
+        self._enter_context(context)
+        return context
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._exit_context(exc_type, exc_value, traceback)
+        self._shard.__exit__(exc_type, exc_value, traceback)
+        set_urlconf(self._previous_urlconf)
+        if self._previous_tenant is None:
+            self._connection.set_schema_to_public()
+        else:
+            self._connection.set_tenant(self._previous_tenant)
+        return False
+
+    async def __aenter__(self):
+        context = await sync_to_async(self._context)()
+        self._enter_context(context)
+        return context
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self._exit_context(exc_type, exc_value, traceback)
+        return False
+
+
+def bind(fn, context=None):
+    """Wrap `fn` to run in `context` (default: the current one) wherever it is called"""
+    context = context or capture()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with tenant_context(context):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def tenant_sync_to_async(fn, **options):
+    """sync_to_async() that runs `fn` in the tenant context of the awaiting task"""
+    @functools.wraps(fn)
+    def in_context(*args, **kwargs):
+        context = _current.get()
+        if context is None:
+            return fn(*args, **kwargs)
+        with tenant_context(context):
+            return fn(*args, **kwargs)
+    return sync_to_async(in_context, **options)
+
+
+def _prepare_process(parent_pid):
+    """Drop the database connections a forked worker inherited from its parent"""
+    if os.getpid() == parent_pid or getattr(_prepare_process, 'pid', None) == os.getpid():
+        return
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        # Spawned (not forked) worker
+        django.setup()
+    for conn in connections.all(initialized_only=True):
+        # Closing would end the parent's session on the shared socket
+        conn.connection = None
+    _prepare_process.pid = os.getpid()
+
+
+class TenantTask:
+    """
+    Picklable callable running `fn(*args, **kwargs)` as the tenant that was
+    current when the task was created; for ProcessPoolExecutor. `fn` must be
+    importable (a module level function).
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        context = capture()
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.schema_name = context.schema_name
+        self.language = context.language
+        self.request_id = context.request_id
+        self.parent_pid = os.getpid()
+
+    @classmethod
+    def for_tenant(cls, tenant, fn, *args, **kwargs):
+        """Task running as `tenant` instead of the current tenant"""
+        task = cls(fn, *args, **kwargs)
+        task.schema_name = tenant.schema_name
+        return task
+
+    def __call__(self):
+        _prepare_process(self.parent_pid)
+        with tenant_context(schema_name=self.schema_name, language=self.language, request_id=self.request_id):
+            return self.fn(*self.args, **self.kwargs)
+
+
+def submit(executor, fn, *args, **kwargs):
+    """executor.submit() that runs `fn` in the current tenant context"""
+    if isinstance(executor, ProcessPoolExecutor):
+        return executor.submit(TenantTask(fn, *args, **kwargs))
+    return executor.submit(bind(closing_connections(fn)), *args, **kwargs)
+
+
+def closing_connections(fn):
+    """Wrap `fn` to close this thread's database connections when it returns"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            # Worker threads never run Django's request_finished cleanup
+            connections.close_all()
+    return wrapper
+
+
+_background = None
+
+
+def get_background_executor():
+    global _background
+    if _background is None:
+        _background = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix='background'
+        )
+        atexit.register(_background.shutdown, wait=True)
+    return _background
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error("Background task failed", exc_info=future.exception())
+
+
+def run_in_background(fn, *args, **kwargs):
+    """Run `fn` on the process-wide background thread pool, in the current tenant context"""
+    future = submit(get_background_executor(), fn, *args, **kwargs)
+    future.add_done_callback(_log_failure)
+    return future
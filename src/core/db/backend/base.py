@@ -0,0 +1,149 @@
+from django.db import DatabaseError, connections
+from django_tenants.postgresql_backend import base as tenant_backend
+from core.db.pool import get_pool
+
+# Session settings a tenant may override (see Tenant.db_session_settings)
+SESSION_SETTINGS = ('statement_timeout', 'lock_timeout', 'work_mem')
+
+
+class DatabaseWrapper(tenant_backend.DatabaseWrapper):
+    """
+    Tenant-aware PostgreSQL backend.
+
+    An alias configured with 'PRIMARY': '<alias>' is treated as a read replica
+    of that alias: before handing out a cursor it switches to the tenant
+    currently selected on the primary connection, so both connections use the
+    same search_path.
+
+    An alias configured with a 'POOL' dict checks connections out of a
+    process-wide core.db.pool.ConnectionPool instead of opening new ones, and
+    gives them back when Django closes the connection (use CONN_MAX_AGE = 0).
+
+    The search_path last applied on the physical connection is remembered so
+    `SET search_path` is only sent when the tenant actually changes. This
+    relies on TENANT_LIMIT_SET_CALLS = True.
+
+    Tenants may carry session settings (Tenant.db_session_settings, e.g.
+    statement_timeout); they are applied the same way, once per tenant
+    switch, and reset for tenants without them.
+    """
+    _applied_search_path = None
+    _applied_session_settings = None  # None: unknown, {}: server defaults
+    _session_settings_checked = False
+
+    @property
+    def connection_pool(self):
+        pool_options = self.settings_dict.get('POOL')
+        if not pool_options:
+            return None
+        return get_pool(self.alias, pool_options)
+
+    def get_new_connection(self, conn_params):
+        pool = self.connection_pool
+        if pool is None:
+            connection = super().get_new_connection(conn_params)
+            self._applied_search_path = None
+            self._applied_session_settings = {}
+        else:
+            connection = pool.getconn(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+            self._applied_search_path = pool.search_path_for(connection)
+            self._applied_session_settings = pool.session_settings_for(connection)
+        self.search_path_set_schemas = None
+        self._session_settings_checked = False
+        self._reuse_applied_search_path(connection)
+        return connection
+
+    def _close(self):
+        pool = self.connection_pool
+        self._applied_search_path = None
+        self._applied_session_settings = None
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
+
+    def set_tenant(self, tenant, include_public=True):
+        super().set_tenant(tenant, include_public)
+        self._session_settings_checked = False
+        self._reuse_applied_search_path(self.connection)
+
+    def _reuse_applied_search_path(self, connection):
+        """Skip the next SET search_path if the connection already uses it"""
+        if connection is None or self._applied_search_path is None or not self.schema_name:
+            return
+        if self._get_cursor_search_paths() == self._applied_search_path:
+            self.search_path_set_schemas = self._applied_search_path
+            if self.connection_pool is not None:
+                self.connection_pool.incr('search_path_skips')
+
+    def _forget_session_state(self):
+        # Rolling back may undo SET statements issued inside the transaction
+        self._applied_search_path = None
+        self.search_path_set_schemas = None
+        self._applied_session_settings = None
+        self._session_settings_checked = False
+        pool = self.connection_pool
+        if pool is not None and self.connection is not None:
+            pool.forget_session_state(self.connection)
+
+    def _rollback(self):
+        self._forget_session_state()
+        return super()._rollback()
+
+    def _savepoint_rollback(self, sid):
+        super()._savepoint_rollback(sid)
+        self._forget_session_state()
+
+    def _cursor(self, name=None):
+        primary_alias = self.settings_dict.get('PRIMARY')
+        if primary_alias:
+            self.follow_primary(connections[primary_alias])
+        cursor = super()._cursor(name=name)
+        if self.search_path_set_schemas is not self._applied_search_path:
+            self._applied_search_path = self.search_path_set_schemas
+            pool = self.connection_pool
+            if pool is not None and self._applied_search_path is None:
+                pool.forget_search_path(self.connection)
+            elif pool is not None:
+                pool.record_search_path(self.connection, self._applied_search_path)
+        if not self._session_settings_checked:
+            self._apply_session_settings()
+        return cursor
+
+    def _apply_session_settings(self):
+        """Set (or reset) the tenant's session settings that differ from the applied ones"""
+        wanted = getattr(self.tenant, 'db_session_settings', None) or {}
+        applied = self._applied_session_settings
+        statements, params = [], []
+        for name in SESSION_SETTINGS:
+            value = wanted.get(name)
+            if applied is not None and applied.get(name) == value:
+                continue
+            if value is None:
+                statements.append(f'RESET {name}')
+            else:
+                statements.append('SELECT set_config(%s, %s, false)')
+                params += [name, str(value)]
+        if statements:
+            # Like django_tenants' SET search_path: in a failed transaction the
+            # statements error too, and so will the query that follows. Forget
+            # what is applied so everything is sent again with the next cursor.
+            try:
+                with self.connection.cursor() as cursor:
+                    cursor.execute('; '.join(statements), params)
+            except (DatabaseError, tenant_backend.psycopg.Error):
+                self._forget_session_state()
+                return
+            self._applied_session_settings = dict(wanted)
+            pool = self.connection_pool
+            if pool is not None:
+                pool.record_session_settings(self.connection, self._applied_session_settings)
+        self._session_settings_checked = True
+
+    def follow_primary(self, primary):
+        """Select the primary connection's tenant if it differs from ours"""
+        if (
+            primary.schema_name != self.schema_name
+            or primary.include_public_schema != self.include_public_schema
+        ):
+            self.set_tenant(primary.tenant, include_public=primary.include_public_schema)
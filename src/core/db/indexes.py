@@ -0,0 +1,12 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models import TextField
+from django.db.models.functions import Cast, Upper
+
+
+def trigram_index(field, name):
+    """
+    GIN trigram index (pg_trgm) on UPPER(field::text): the expression Django's
+    icontains / istartswith / iexact lookups compare on PostgreSQL, so plain
+    admin and API searches can use it. Needs the pg_trgm extension.
+    """
+    return GinIndex(OpClass(Upper(Cast(field, TextField())), name='gin_trgm_ops'), name=name)
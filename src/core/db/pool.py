@@ -0,0 +1,231 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection became available within the pool timeout"""
+
+
+class ConnectionPool:
+    """
+    Small thread-safe pool of psycopg2 connections for one database alias.
+
+    Idle connections are reused LIFO so the hottest ones stay warm. A connection
+    is health checked with `SELECT 1` when it sat idle for longer than
+    `check_interval`, and is discarded once it outlives `max_lifetime` or, above
+    `min_size`, once it has been idle for `max_idle`.
+
+    The pool also remembers the search_path and tenant session settings last
+    applied on every connection so the tenant backend can skip redundant
+    `SET` statements.
+    """
+
+    def __init__(self, alias, min_size=0, max_size=10, timeout=5.0,
+                 max_lifetime=1800.0, max_idle=600.0, check_interval=30.0):
+        self.alias = alias
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+        self.pid = os.getpid()
+
+        self._lock = threading.Condition()
+        self._idle = deque()    # (connection, returned_at)
+        self._created_at = {}   # id(connection) -> monotonic time
+        self._search_paths = {}  # id(connection) -> list of schemas
+        self._session_settings = {}  # id(connection) -> dict of applied settings
+        self._size = 0
+        self._counters = dict.fromkeys((
+            'checkouts', 'waits', 'timeouts', 'connections_created',
+            'connections_discarded', 'health_checks', 'health_check_failures',
+            'search_path_sets', 'search_path_skips', 'session_settings_sets',
+        ), 0)
+
+    def getconn(self, connect):
+        """
+        Check out a connection, creating one with `connect()` if the pool is
+        not full. Blocks up to `timeout` seconds when it is.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            connection, returned_at = self._reserve(deadline)
+            if connection is None:
+                return self._create(connect)
+            if self._is_healthy(connection, returned_at):
+                self.incr('checkouts')
+                return connection
+            self._discard(connection)
+
+    def putconn(self, connection):
+        """Return a connection to the pool, discarding it if it is unusable"""
+        if connection.closed or self._is_expired(connection, time.monotonic()):
+            self._discard(connection)
+            return
+        if connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                self._discard(connection)
+                return
+            # A rolled back transaction may have reverted a SET search_path
+            self.forget_session_state(connection)
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+            self._lock.notify()
+
+    def _reserve(self, deadline):
+        """Pop an idle connection, or reserve a slot for a new one (None)"""
+        with self._lock:
+            waited = False
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    logger.warning("Database pool '%s' exhausted (%d connections)", self.alias, self._size)
+                    raise PoolTimeout(
+                        f"Couldn't get a connection from pool '{self.alias}' within {self.timeout}s"
+                    )
+                if not waited:
+                    self._counters['waits'] += 1
+                    waited = True
+                self._lock.wait(remaining)
+
+    def _create(self, connect):
+        try:
+            connection = connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._created_at[id(connection)] = time.monotonic()
+            self._session_settings[id(connection)] = {}  # Server defaults
+            self._counters['connections_created'] += 1
+            self._counters['checkouts'] += 1
+        return connection
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        with self._lock:
+            self._created_at.pop(id(connection), None)
+            self._search_paths.pop(id(connection), None)
+            self._session_settings.pop(id(connection), None)
+            self._size -= 1
+            self._counters['connections_discarded'] += 1
+            self._lock.notify()
+
+    def _is_expired(self, connection, now):
+        created_at = self._created_at.get(id(connection), now)
+        return bool(self.max_lifetime) and now - created_at > self.max_lifetime
+
+    def _is_healthy(self, connection, returned_at):
+        now = time.monotonic()
+        if connection.closed or self._is_expired(connection, now):
+            return False
+        idle_for = now - returned_at
+        if self.max_idle and idle_for > self.max_idle and self._size > self.min_size:
+            return False
+        if idle_for <= self.check_interval:
+            return True
+        self.incr('health_checks')
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except psycopg2.Error:
+            self.incr('health_check_failures')
+            return False
+        return True
+
+    def search_path_for(self, connection):
+        return self._search_paths.get(id(connection))
+
+    def record_search_path(self, connection, search_paths):
+        self._search_paths[id(connection)] = search_paths
+        self.incr('search_path_sets')
+
+    def forget_search_path(self, connection):
+        self._search_paths.pop(id(connection), None)
+
+    def session_settings_for(self, connection):
+        return self._session_settings.get(id(connection))
+
+    def record_session_settings(self, connection, values):
+        self._session_settings[id(connection)] = values
+        self.incr('session_settings_sets')
+
+    def forget_session_state(self, connection):
+        """Forget what was applied on the connection (e.g. after a rollback)"""
+        self._search_paths.pop(id(connection), None)
+        self._session_settings.pop(id(connection), None)
+
+    def incr(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self):
+        """Snapshot of the pool gauges and counters"""
+        with self._lock:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+                **self._counters,
+            }
+
+    def close(self):
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options):
+    """Return the process-wide pool for a database alias, creating it on first use"""
+    pool = _pools.get(alias)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pools_lock:
+        pool = _pools.get(alias)
+        # Connections inherited through fork() belong to the parent process
+        if pool is None or pool.pid != os.getpid():
+            pool = ConnectionPool(
+                alias,
+                min_size=options.get('MIN_SIZE', 0),
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 5.0),
+                max_lifetime=options.get('MAX_LIFETIME', 1800.0),
+                max_idle=options.get('MAX_IDLE', 600.0),
+                check_interval=options.get('CHECK_INTERVAL', 30.0),
+            )
+            _pools[alias] = pool
+    return pool
+
+
+def pool_stats():
+    """Stats of every pool opened by this process, keyed by alias"""
+    return {alias: pool.stats() for alias, pool in _pools.items() if pool.pid == os.getpid()}
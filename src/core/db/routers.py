@@ -0,0 +1,140 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class RoutingState:
+    """
+    Per-request routing flags.
+
+    A single mutable object is shared by the request context so that writes
+    performed in copied contexts (threads, sync_to_async) still pin the request.
+    """
+    __slots__ = ('replica_reads', 'pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.replica_reads = False
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+_shard = ContextVar('db_shard', default=None)
+
+
+@contextmanager
+def routing_scope(pinned=False):
+    """Open a routing scope (one per request). Replica reads are off until allowed"""
+    token = _state.set(RoutingState(pinned=pinned))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+def allow_replica_reads():
+    """Let reads in the current scope go to a replica (unless pinned)"""
+    state = _state.get()
+    if state is not None:
+        state.replica_reads = True
+
+
+def pin_to_primary():
+    """Send every following read of the current scope to the primary"""
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+
+
+def get_replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def get_shard_aliases():
+    return getattr(settings, 'DATABASE_SHARDS', [DEFAULT_DB_ALIAS])
+
+
+def current_shard():
+    """Alias of the shard selected for the current context, or None"""
+    return _shard.get()
+
+
+@contextmanager
+def shard_scope(alias):
+    """
+    Route every query of the block to the shard `alias`. The caller selects
+    the tenant/schema on `connections[alias]`.
+    """
+    token = _shard.set(alias)
+    try:
+        yield connections[alias]
+    finally:
+        _shard.reset(token)
+
+
+class ShardRouter:
+    """
+    Sends all queries to the shard of the current tenant.
+
+    Tenant schemas live on the alias recorded in Tenant.database; the tenant
+    directory (the public-schema models of `directory_app_labels`: Tenant,
+    Domain, Invitation, TenantStats) stays on the default database, even
+    inside a shard scope. Outside a shard scope (or on the default shard)
+    routing falls through to the next router.
+    """
+    directory_app_labels = frozenset({'tenants'})
+
+    def _shard_for(self, model):
+        shard = _shard.get()
+        if shard == DEFAULT_DB_ALIAS or model._meta.app_label in self.directory_app_labels:
+            return None
+        return shard
+
+    def db_for_read(self, model, **hints):
+        return self._shard_for(model)
+
+    def db_for_write(self, model, **hints):
+        return self._shard_for(model)
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a replica when the current request allows it.
+
+    Reads stay on the primary when:
+    - no routing scope is active (shell, management commands, migrations)
+    - the view did not opt in (see core.middleware.ReplicaRoutingMiddleware)
+    - something was written earlier in the request, or the client is still
+      inside its read-your-writes window
+    - the primary connection is inside a transaction
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_reads or state.pinned:
+            return None
+        replicas = get_replica_aliases()
+        if not replicas or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = True
+            state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *get_replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through streaming replication
+        if db in get_replica_aliases():
+            return False
+        return None
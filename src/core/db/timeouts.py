@@ -0,0 +1,43 @@
+"""Detection and counting of queries cancelled by tenant session limits"""
+import logging
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE -> setting that triggered it
+TIMEOUT_CODES = {
+    '57014': 'statement_timeout',  # query_canceled
+    '55P03': 'lock_timeout',       # lock_not_available
+}
+
+
+def timeout_kind(exception):
+    """'statement_timeout' / 'lock_timeout' if the database error was one, else None"""
+    cause = exception.__cause__ if exception.__cause__ is not None else exception
+    return TIMEOUT_CODES.get(getattr(cause, 'pgcode', None))
+
+
+def _counter_key(schema_name, kind):
+    return f'db-timeouts:{schema_name}:{kind}'
+
+
+def record_timeout(schema_name, kind):
+    key = _counter_key(schema_name, kind)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, None)
+    logger.warning("Query in tenant %s cancelled by %s", schema_name, kind)
+
+
+def get_timeout_counts(schema_name):
+    """Timeouts hit by a tenant since the counters were last reset"""
+    keys = {kind: _counter_key(schema_name, kind) for kind in TIMEOUT_CODES.values()}
+    counts = cache.get_many(keys.values())
+    return {kind: counts.get(key, 0) for kind, key in keys.items()}
+
+
+def reset_timeout_counts(schema_name):
+    cache.delete_many([_counter_key(schema_name, kind) for kind in TIMEOUT_CODES.values()])
@@ -0,0 +1,52 @@
+import functools
+import ipaddress
+
+
+class NetworkSet:
+    """
+    Set of IPv4/IPv6 networks (CIDR strings or plain addresses) compiled for
+    fast membership tests: networks are grouped by prefix length, so a lookup
+    is one shift and one set probe per distinct prefix length.
+    """
+
+    def __init__(self, networks=(), cache_size=4096):
+        self._prefixes = {4: {}, 6: {}}  # version -> {prefix length: {network int >> host bits}}
+        for network in networks:
+            network = ipaddress.ip_network(network, strict=False)
+            host_bits = network.max_prefixlen - network.prefixlen
+            self._prefixes[network.version].setdefault(host_bits, set()).add(
+                int(network.network_address) >> host_bits
+            )
+        self.contains = functools.lru_cache(maxsize=cache_size)(self._contains)
+
+    def _contains(self, address):
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        if ip.version == 6 and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped
+        value = int(ip)
+        return any(value >> host_bits in prefixes for host_bits, prefixes in self._prefixes[ip.version].items())
+
+    def __contains__(self, address):
+        return self.contains(address)
+
+    def __bool__(self):
+        return any(self._prefixes.values())
+
+
+def get_client_ip(request, trusted_proxies):
+    """
+    Address of the client. X-Forwarded-For is only honored when the request
+    comes from a trusted proxy, and is read right to left, skipping the
+    trusted hops, so a client can't spoof it by sending its own header.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    if not trusted_proxies or remote_addr not in trusted_proxies:
+        return remote_addr
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    for address in reversed([hop.strip() for hop in forwarded.split(',') if hop.strip()]):
+        if address not in trusted_proxies:
+            return address
+    return remote_addr
@@ -0,0 +1,46 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from core.api.schema import SCHEMA_VARIANTS, generate_schema, schema_file_path
+
+RENDERERS = {
+    'json': OpenApiJsonRenderer,
+    'yaml': OpenApiYamlRenderer,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the public and tenant OpenAPI schemas for every language and "
+        "write them under OPENAPI_SCHEMA_DIR/<version>/, where api/schema/ "
+        "serves them. Run it at build time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--variant', choices=sorted(SCHEMA_VARIANTS), action='append',
+                            help='Only build this variant (repeatable)')
+        parser.add_argument('--language', action='append',
+                            help='Only build this language (repeatable)')
+
+    def handle(self, *args, **options):
+        variants = options['variant'] or list(SCHEMA_VARIANTS)
+        languages = options['language'] or [code for code, _ in settings.LANGUAGES]
+
+        for variant in variants:
+            for language in languages:
+                schema = generate_schema(variant, language)
+                for fmt, renderer_class in RENDERERS.items():
+                    path = schema_file_path(variant, language, fmt)
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    partial = path.with_suffix(f'.{fmt}.partial')
+                    partial.write_bytes(renderer_class().render(schema, renderer_context={}))
+                    # Atomic, so running workers never read a half written file
+                    os.replace(partial, path)
+                    self.stdout.write(f"Wrote {path}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"OpenAPI schema {spectacular_settings.VERSION} built for "
+            f"{', '.join(variants)} in {', '.join(languages)}"
+        ))
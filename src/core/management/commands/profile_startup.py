@@ -0,0 +1,110 @@
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: times every AppConfig.ready() during
+# django.setup(), then the import of each urlconf, and prints them as JSON.
+PROFILE_SCRIPT = '''
+import json, sys, time
+from importlib import import_module
+from django.apps.config import AppConfig
+
+ready_times = {}
+create = AppConfig.create.__func__
+
+def timed_create(cls, entry):
+    config = create(cls, entry)
+    ready = config.ready
+
+    def timed_ready():
+        started = time.perf_counter()
+        ready()
+        ready_times[config.label] = time.perf_counter() - started
+
+    config.ready = timed_ready
+    return config
+
+AppConfig.create = classmethod(timed_create)
+
+started = time.perf_counter()
+import django
+django.setup()
+setup_time = time.perf_counter() - started
+
+urlconf_times = {}
+for urlconf in sys.argv[1:]:
+    urlconf_started = time.perf_counter()
+    import_module(urlconf)
+    urlconf_times[urlconf] = time.perf_counter() - urlconf_started
+
+print(json.dumps({
+    'setup': setup_time,
+    'ready': ready_times,
+    'urlconfs': urlconf_times,
+    'total': time.perf_counter() - started,
+}))
+'''
+
+
+def parse_importtime(stderr):
+    """[(cumulative seconds, self seconds, module)] from `python -X importtime` output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            # Nested imports are indented by two spaces per level
+            modules.append((int(cumulative_us) / 1e6, int(self_us) / 1e6, name.rstrip()[1:]))
+        except ValueError:
+            continue  # Header line
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker startup in a fresh interpreter: django.setup(), each "
+        "app's ready(), the urlconf imports and the slowest module imports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25,
+                            help='Number of slowest imports to list')
+        parser.add_argument('--json', action='store_true',
+                            help='Print the raw measurements as JSON')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ['DJANGO_SETTINGS_MODULE']}
+        urlconfs = [settings.ROOT_URLCONF, settings.PUBLIC_SCHEMA_URLCONF]
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROFILE_SCRIPT, *urlconfs],
+            env=env, capture_output=True, text=True, cwd=settings.BASE_DIR,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Profiling run failed:\n{result.stderr[-2000:]}")
+
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        imports = parse_importtime(result.stderr)
+        # Top-level entries only: nested imports are part of their parent's cumulative time
+        slowest = sorted((m for m in imports if not m[2].startswith(' ')), reverse=True)[:options['limit']]
+
+        if options['json']:
+            timings['imports'] = [
+                {'module': name.strip(), 'cumulative': cumulative, 'self': own}
+                for cumulative, own, name in slowest
+            ]
+            self.stdout.write(json.dumps(timings, indent=2))
+            return
+
+        self.stdout.write(f"django.setup()  {timings['setup']:.3f}s")
+        for label, seconds in sorted(timings['ready'].items(), key=lambda item: -item[1]):
+            self.stdout.write(f"  {label}.ready()  {seconds:.3f}s")
+        for urlconf, seconds in timings['urlconfs'].items():
+            self.stdout.write(f"import {urlconf}  {seconds:.3f}s")
+        self.stdout.write(f"\nSlowest top-level imports ({len(imports)} modules imported):")
+        for cumulative, own, name in slowest:
+            self.stdout.write(f"  {cumulative:8.3f}s  (self {own:.3f}s)  {name.strip()}")
+        self.stdout.write(self.style.SUCCESS(f"\nTotal {timings['total']:.3f}s"))
@@ -1,28 +1,237 @@
+import re
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, connections
+from django.utils.cache import patch_vary_headers
 from django.utils.translation import activate
 from .utils import get_language_from_request
-from django.http import Http404
+from .db import routers
+from .ip import NetworkSet, get_client_ip
+from .db.timeouts import record_timeout, timeout_kind
+from .activity import activity_buffer
+from .context import TenantContext, _current, new_request_id
+from tenants.archive import request_rehydration
+from django.http import Http404, JsonResponse
+from django.utils.translation import gettext as _
+from django_tenants.utils import get_public_schema_name
 
 class LanguageMiddleware:
+    """
+    Negotiates the request language (replaces django's LocaleMiddleware).
+
+    Accept-Language parsing is memoized in core.utils; authenticated API
+    requests may switch to the user's preferred language later on (see
+    core.authentication.LanguageJWTAuthentication).
+    """
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        # Activate the language for this request
         language = get_language_from_request(request)
         activate(language)
-        
+        request.LANGUAGE_CODE = language
+
         response = self.get_response(request)
-        
-        # Add language to response headers
-        response['Content-Language'] = language
+
+        # The view may have switched language (user preference)
+        response.setdefault('Content-Language', request.LANGUAGE_CODE)
+        patch_vary_headers(response, ('Accept-Language',))
         return response
 
 class AdminAccessMiddleware:
+    """
+    Hides the admin (404) from clients outside ADMIN_ALLOWED_IPS.
+
+    The allowlist and ADMIN_TRUSTED_PROXIES accept addresses and CIDR ranges
+    and are compiled once per process; the client address is taken from
+    X-Forwarded-For only behind a trusted proxy. Other paths return right away.
+    """
     def __init__(self, get_response):
         self.get_response = get_response
+        self.prefix = settings.ADMIN_URL_PREFIX
+        self.allowed = NetworkSet(settings.ADMIN_ALLOWED_IPS)
+        self.trusted_proxies = NetworkSet(settings.ADMIN_TRUSTED_PROXIES)
 
     def __call__(self, request):
-        if request.path.startswith('/admin/'):
-            if request.META.get('REMOTE_ADDR') not in ['127.0.0.1', 'localhost']:
+        if request.path.startswith(self.prefix):
+            if get_client_ip(request, self.trusted_proxies) not in self.allowed:
                 raise Http404()
-        return self.get_response(request)
\ No newline at end of file
+        return self.get_response(request)
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe reads of opted-in views go to the read replicas.
+
+    DRF viewsets opt in per action with `replica_read_actions`; admin
+    changelists opt in with REPLICA_ADMIN_CHANGELISTS. After a write the
+    client gets a short-lived cookie that keeps its reads on the primary
+    (read-your-writes).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = settings.REPLICA_PIN_COOKIE in request.COOKIES
+        with routers.routing_scope(pinned=pinned) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in ('GET', 'HEAD') and self.is_replica_safe(request, view_func):
+            routers.allow_replica_reads()
+        return None
+
+    def is_replica_safe(self, request, view_func):
+        # DRF viewsets expose the method -> action mapping on the view function
+        view_class = getattr(view_func, 'cls', None)
+        actions = getattr(view_func, 'actions', None)
+        if view_class is not None and actions:
+            action = actions.get('get')
+            return action in getattr(view_class, 'replica_read_actions', ())
+
+        match = request.resolver_match
+        return bool(
+            settings.REPLICA_ADMIN_CHANGELISTS
+            and match is not None
+            and match.url_name
+            and match.url_name.endswith('_changelist')
+            and hasattr(view_func, 'model_admin')
+        )
+
+
+class ActivityTrackingMiddleware:
+    """
+    Records when the current tenant and user were last seen.
+
+    Only the in-memory core.activity buffer is touched here; the database is
+    written in batches off the request path.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if settings.ACTIVITY_TRACKING:
+            self.track(request)
+        return response
+
+    def track(self, request):
+        tenant = getattr(request, 'tenant', None)
+        if tenant is not None and tenant.schema_name == get_public_schema_name():
+            tenant = None
+        # DRF copies the authenticated (JWT) user onto the Django request
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            user = None
+        if tenant is not None or user is not None:
+            activity_buffer.touch(tenant, user)
+
+
+class ArchivedTenantMiddleware:
+    """
+    Answers requests for an archived tenant with 503 + Retry-After while its
+    schema is restored in the background (see tenants.archive). Tenants being
+    archived or moved to another shard get the same response (see
+    tenants.shards).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tenant = getattr(request, 'tenant', None)
+        if tenant is None:
+            return self.get_response(request)
+        if tenant.is_archived:
+            request_rehydration(tenant)
+        if tenant.is_archived or tenant.archiving_at or tenant.moving_to:
+            response = JsonResponse(
+                {'detail': _('This workspace is waking up. Please retry in a few seconds.')},
+                status=503,
+            )
+            response['Retry-After'] = str(settings.TENANT_REHYDRATE_RETRY_AFTER)
+            return response
+        return self.get_response(request)
+
+
+class TenantShardMiddleware:
+    """
+    Sends the queries of a request to the shard holding its tenant.
+
+    Runs right after TenantMainMiddleware, which resolves the tenant from the
+    directory on the default database.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tenant = getattr(request, 'tenant', None)
+        alias = getattr(tenant, 'database', DEFAULT_DB_ALIAS)
+        if alias == DEFAULT_DB_ALIAS:
+            return self.get_response(request)
+        connections[alias].set_tenant(tenant)
+        with routers.shard_scope(alias):
+            return self.get_response(request)
+
+
+class RequestContextMiddleware:
+    """
+    Publishes the request's tenant and request id as the current
+    core.context.TenantContext, so work handed to threads, tasks or processes
+    (core.context.bind / submit / TenantTask) runs as the same tenant.
+
+    The request id is taken from X-Request-ID when it looks sane, and echoed
+    back in the response.
+    """
+    request_id_re = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get('X-Request-ID', '')
+        if not self.request_id_re.match(request_id):
+            request_id = new_request_id()
+        request.request_id = request_id
+
+        tenant = getattr(request, 'tenant', None)
+        if tenant is not None and tenant.schema_name == get_public_schema_name():
+            tenant = None
+        token = _current.set(TenantContext(tenant=tenant, urlconf=getattr(request, 'urlconf', None), request_id=request_id))
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        response.setdefault('X-Request-ID', request_id)
+        return response
+
+
+class DatabaseTimeoutMiddleware:
+    """
+    Counts queries cancelled by the tenant's statement_timeout / lock_timeout
+    (see core.db.timeouts) and answers them with 503 instead of a 500.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, DatabaseError):
+            return None
+        kind = timeout_kind(exception)
+        if kind is None:
+            return None
+        record_timeout(connection.schema_name, kind)
+        response = JsonResponse(
+            {'detail': _('The request took too long to process. Please try again.')},
+            status=503,
+        )
+        response['Retry-After'] = '1'
+        return response
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .cache import IGNORED_MODELS, IGNORED_UPDATES, invalidate_models
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_cached_responses(sender, using, update_fields=None, **kwargs):
+    """Invalidate cached API responses built from the written model"""
+    label = sender._meta.label
+    if label in IGNORED_MODELS:
+        return
+    if update_fields and update_fields <= IGNORED_UPDATES.get(label, set()):
+        return
+    invalidate_models(sender, using=using)
+
+
+@receiver(m2m_changed)
+def invalidate_cached_responses_m2m(sender, instance, action, model, using, **kwargs):
+    """Invalidate cached API responses when a many-to-many relation changes"""
+    if action.startswith('post_'):
+        invalidate_models(type(instance), model, using=using)
@@ -0,0 +1,13 @@
+'use strict';
+// Reloads the changelist when a core.admin.AutocompleteFilter select changes
+{
+    const $ = django.jQuery;
+    $(function() {
+        $('.autocomplete-filter select').on('change', function() {
+            const filter = this.closest('.autocomplete-filter');
+            const queryString = filter.dataset.queryString;
+            const lookup = encodeURIComponent(filter.dataset.lookup) + '=' + encodeURIComponent(this.value);
+            window.location.search = this.value ? queryString + (queryString.length > 1 ? '&' : '') + lookup : queryString;
+        });
+    });
+}
@@ -1,3 +1,575 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import decimal
+import importlib
+import pickle
+import threading
+import time
+import uuid
+from unittest import mock
+from django.apps import apps
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError, connections, router
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import URLResolver, get_resolver, get_urlconf, reverse
+from django.utils import timezone, translation
+from django.utils.translation import gettext_lazy
+from rest_framework import viewsets
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+from django_tenants.middleware.main import TenantMainMiddleware
+from core.authentication import LanguageJWTAuthentication
+from core import cache as response_cache
+from core import context
+from core.admin import LookaheadPaginator, estimated_count
+from core.api.renderers import FastJSONRenderer
+from core.api.mixins import ConditionalGetMixin
+from core.db import routers
+from core.signals import invalidate_cached_responses
+from core.db.pool import ConnectionPool, PoolTimeout, psycopg2, extensions
+from tenants.models import Domain, Invitation, Tenant, TenantStats
+from users.api.views import TenantUserViewSet
+from users.models import CustomUser
 
-# Create your tests here.
+# Route prefixes served only by the full (prod) profile
+NON_API_PREFIXES = ('admin/', 'api/schema/', 'api/docs/', 'api/redoc/', 'api-auth/', '__debug__/')
+
+
+def routes(urlconf):
+    """{route: (view class or function, actions)} of every endpoint of a urlconf"""
+    def walk(patterns, prefix):
+        for pattern in patterns:
+            route = prefix + str(pattern.pattern)
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns, route)
+            else:
+                callback = pattern.callback
+                actions = tuple(sorted((getattr(callback, 'actions', None) or {}).items()))
+                yield route, (getattr(callback, 'cls', callback), actions)
+
+    return dict(walk(get_resolver(urlconf).url_patterns, ''))
+
+
+class APIProfileTests(SimpleTestCase):
+    """The API-only worker profile (settings.api) must serve the same API"""
+
+    def assertSameAPI(self, full_urlconf, api_urlconf):
+        expected = {
+            route: view for route, view in routes(full_urlconf).items()
+            if not route.startswith(NON_API_PREFIXES)
+        }
+        self.assertTrue(expected)
+        self.assertEqual(routes(api_urlconf), expected)
+
+    def test_tenant_urls(self):
+        self.assertSameAPI('budgenus.urls', 'budgenus.urls_api')
+
+    def test_public_urls(self):
+        self.assertSameAPI('budgenus.urls_public', 'budgenus.urls_api_public')
+
+    def test_middleware(self):
+        full = importlib.import_module('budgenus.settings.prod')
+        api = importlib.import_module('budgenus.settings.api')
+        # Same stack in the same order, minus the excluded layers
+        self.assertEqual(api.MIDDLEWARE, [m for m in full.MIDDLEWARE if m not in api.API_EXCLUDED_MIDDLEWARE])
+        self.assertEqual(api.REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'], full.REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'])
+        self.assertEqual(api.REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'], full.REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'])
+        self.assertNotIn('SessionAuthentication', str(api.REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES']))
+
+    def test_app_lists_match_installed_apps(self):
+        api = importlib.import_module('budgenus.settings.api')
+        for app in api.API_EXCLUDED_APPS:
+            self.assertNotIn(app, api.SHARED_APPS)
+            self.assertNotIn(app, api.TENANT_APPS)
+        self.assertEqual(set(api.INSTALLED_APPS), set(api.SHARED_APPS) | set(api.TENANT_APPS))
+
+    def test_keeps_every_relation(self):
+        # A model left out of the registry is left out of delete cascades too,
+        # while its table (migrated by the prod settings) keeps its foreign keys
+        def relations(installed_apps):
+            with override_settings(INSTALLED_APPS=installed_apps):
+                return {
+                    (model._meta.label, relation.related_model._meta.label)
+                    for model in apps.get_models() for relation in model._meta.related_objects
+                }
+
+        full = importlib.import_module('budgenus.settings.prod')
+        api = importlib.import_module('budgenus.settings.api')
+        self.assertIn(('users.CustomUser', 'admin.LogEntry'), relations(api.INSTALLED_APPS))
+        self.assertEqual(relations(api.INSTALLED_APPS), relations(full.INSTALLED_APPS))
+
+
+class APIProfileRequestTests(TestCase):
+    """The same requests through the full (prod) and API-only profiles"""
+
+    def setUp(self):
+        self.tenant = Tenant(pk=1, schema_name='acme', name='Acme')
+        self.user = mock.Mock(pk=1, is_authenticated=True, is_active=True, is_superuser=True,
+                              preferred_language='fr')
+        token = AccessToken()
+        token['user_id'] = self.user.pk
+        self.token = str(token)
+        patches = [
+            mock.patch.object(TenantMainMiddleware, 'get_tenant', return_value=self.tenant),
+            mock.patch.object(LanguageJWTAuthentication, 'get_user', return_value=self.user),
+            mock.patch('tenants.api.views.platform_summary', return_value={'tenants': 1}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def request(self, profile, **headers):
+        module = importlib.import_module(f'budgenus.settings.{profile}')
+        with override_settings(
+            MIDDLEWARE=module.MIDDLEWARE,
+            ROOT_URLCONF=module.ROOT_URLCONF,
+            PUBLIC_SCHEMA_URLCONF=module.PUBLIC_SCHEMA_URLCONF,
+            ACTIVITY_TRACKING=True,
+        ), mock.patch('core.middleware.activity_buffer') as activity:
+            response = self.client.get('/api/tenants/stats/', **headers)
+        return response, activity.touch
+
+    def test_same_responses(self):
+        for headers in ({}, {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}):
+            full, _ = self.request('prod', **headers)
+            api, _ = self.request('api', **headers)
+            with self.subTest(authenticated=bool(headers)):
+                self.assertEqual(api.status_code, full.status_code)
+                self.assertEqual(api.json(), full.json())
+                self.assertEqual(api['Content-Language'], full['Content-Language'])
+
+    def test_activity_tracking_sees_the_jwt_user(self):
+        # Without AuthenticationMiddleware, request.user is the one DRF authenticated
+        for profile in ('prod', 'api'):
+            with self.subTest(profile=profile):
+                response, touch = self.request(profile, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+                self.assertEqual(response.status_code, 200)
+                touch.assert_called_once_with(self.tenant, self.user)
+
+    def test_destroying_a_user_cascades_to_admin_log(self):
+        [tenant] = Tenant.objects.bulk_create([Tenant(schema_name='acme', name='Acme')])
+        view = TenantUserViewSet.as_view({'delete': 'destroy'})
+        for profile in ('prod', 'api'):
+            with self.subTest(profile=profile):
+                user = CustomUser.objects.create(email=f'{profile}@example.com', tenant=tenant)
+                LogEntry.objects.create(
+                    user=user, content_type=ContentType.objects.get_for_model(Tenant),
+                    object_id=str(tenant.pk), object_repr='Acme', action_flag=CHANGE,
+                )
+                request = APIRequestFactory().delete(f'/api/users/{user.pk}/')
+                request.tenant = tenant
+                force_authenticate(request, self.user)
+                module = importlib.import_module(f'budgenus.settings.{profile}')
+                with override_settings(INSTALLED_APPS=module.INSTALLED_APPS):
+                    response = view(request, pk=user.pk)
+                    # What the deferred foreign key checks would run at commit
+                    connections['default'].check_constraints()
+                self.assertEqual(response.status_code, 204)
+                self.assertFalse(LogEntry.objects.filter(user_id=user.pk).exists())
+
+
+
+class LanguageJWTAuthenticationTests(SimpleTestCase):
+    def authenticate(self, user_language, claim):
+        token = AccessToken()
+        token['user_id'] = 1
+        if claim:
+            token['preferred_language'] = claim
+        user = mock.Mock(pk=1, is_active=True, preferred_language=user_language)
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        with mock.patch.object(LanguageJWTAuthentication, 'get_user', return_value=user), \
+                translation.override('en'):
+            LanguageJWTAuthentication().authenticate(Request(request))
+            return request.LANGUAGE_CODE if hasattr(request, 'LANGUAGE_CODE') else None
+
+    def test_user_preference_wins_over_the_claim(self):
+        # Changed after the token was issued
+        self.assertEqual(self.authenticate('fr', 'en'), 'fr')
+
+    def test_claim_is_a_fallback(self):
+        self.assertEqual(self.authenticate('', 'fr'), 'fr')
+
+
+class AdminURLTests(SimpleTestCase):
+    """Both urlconfs mount an admin under the 'admin' application namespace"""
+
+    def test_admin_reverses(self):
+        for urlconf in ('budgenus.urls', 'budgenus.urls_public'):
+            with self.subTest(urlconf=urlconf):
+                self.assertEqual(reverse('admin:index', urlconf=urlconf), '/admin/')
+                self.assertEqual(reverse('admin:login', urlconf=urlconf), '/admin/login/')
+
+
+class ShardRouterTests(SimpleTestCase):
+    """Inside a shard scope only tenant data moves; the directory stays on default"""
+
+    def shard_scope(self, alias):
+        # No real 'shard1' connection is needed to route
+        return mock.patch.object(routers, 'connections', {alias: mock.sentinel.connection})
+
+    def test_directory_models_stay_on_default(self):
+        with self.shard_scope('shard1'), routers.shard_scope('shard1'):
+            for model in (Tenant, Domain, Invitation, TenantStats):
+                with self.subTest(model=model.__name__):
+                    self.assertEqual(router.db_for_read(model), 'default')
+                    self.assertEqual(router.db_for_write(model), 'default')
+
+    def test_tenant_models_go_to_the_shard(self):
+        with self.shard_scope('shard1'), routers.shard_scope('shard1'):
+            self.assertEqual(router.db_for_read(CustomUser), 'shard1')
+            self.assertEqual(router.db_for_write(CustomUser), 'shard1')
+        self.assertEqual(router.db_for_read(CustomUser), 'default')
+
+    def test_default_shard_falls_through(self):
+        with routers.shard_scope('default'):
+            self.assertIsNone(routers.ShardRouter().db_for_read(CustomUser))
+
+
+class StubViewSet(viewsets.GenericViewSet):
+    authentication_classes = []
+    permission_classes = []
+
+    def get_queryset(self):
+        return mock.MagicMock()
+
+    def get_object(self):
+        return mock.Mock(pk=1, updated_at=self.stats['last_modified'])
+
+    def get_serializer(self, instance):
+        return mock.Mock(data={'id': instance.pk})
+
+    def list(self, request, *args, **kwargs):
+        return Response([])
+
+
+class ConditionalViewSet(ConditionalGetMixin, StubViewSet):
+    stats = None
+
+    def get_validator_stats(self, queryset):
+        return self.stats
+
+
+class ConditionalGetTests(SimpleTestCase):
+    """Validators must change with every edit and delete, nested data included"""
+
+    updated = timezone.make_aware(datetime.datetime(2026, 10, 1, 12, 30, 15, 123456))
+
+    def get(self, action, stats, **headers):
+        view = ConditionalViewSet.as_view({'get': action}, stats=stats)
+        kwargs = {'pk': 1} if action == 'retrieve' else {}
+        return view(APIRequestFactory().get('/things/', **headers), **kwargs)
+
+    def list_stats(self, **changes):
+        stats = {
+            'count': 2, 'last_modified': self.updated,
+            'address__count': 1, 'address__last_modified': self.updated,
+        }
+        return {**stats, **changes}
+
+    def assertListStatus(self, status, **changes):
+        etag = self.get('list', self.list_stats())['ETag']
+        response = self.get('list', self.list_stats(**changes), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status)
+
+    def test_unchanged_list_is_not_modified(self):
+        self.assertListStatus(304)
+
+    def test_edit_changes_the_list(self):
+        self.assertListStatus(200, last_modified=self.updated + datetime.timedelta(seconds=1))
+
+    def test_delete_changes_the_list(self):
+        self.assertListStatus(200, count=1)
+
+    def test_related_edit_and_delete_change_the_list(self):
+        self.assertListStatus(200, address__last_modified=self.updated + datetime.timedelta(seconds=1))
+        self.assertListStatus(200, address__count=0)
+
+    def test_list_has_no_last_modified(self):
+        # Deletions move no timestamp, only the ETag can see them
+        self.assertNotIn('Last-Modified', self.get('list', self.list_stats()))
+
+    def test_retrieve_last_modified_has_second_precision(self):
+        response = self.get('retrieve', {'count': 1, 'last_modified': self.updated})
+        self.assertEqual(response['Last-Modified'], 'Thu, 01 Oct 2026 12:30:15 GMT')
+        response = self.get(
+            'retrieve', {'count': 1, 'last_modified': self.updated},
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class CachedConditionalViewSet(ConditionalViewSet):
+    @response_cache.cached_response(models=['tenants.Tenant'])
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class CachedResponseTests(SimpleTestCase):
+    def setUp(self):
+        response_cache.get_cache().clear()
+        self.stats = {'count': 1, 'last_modified': ConditionalGetTests.updated}
+
+    def get(self, **headers):
+        view = CachedConditionalViewSet.as_view({'get': 'retrieve'}, stats=self.stats)
+        return view(APIRequestFactory().get('/things/1/', **headers), pk=1)
+
+    def test_hits_keep_the_view_validators(self):
+        miss = self.get()
+        hit = self.get()
+        self.assertEqual(hit['ETag'], miss['ETag'])
+        self.assertEqual(hit['Last-Modified'], miss['Last-Modified'])
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=miss['ETag']).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=miss['Last-Modified']).status_code, 304)
+
+    def test_generations_are_per_schema(self):
+        with mock.patch.object(response_cache, 'connection', mock.Mock(schema_name='acme')):
+            acme = response_cache.get_generations(['tenants.Tenant'])
+            with mock.patch.object(response_cache, 'connection', mock.Mock(schema_name='other')):
+                response_cache.invalidate_models('tenants.Tenant')
+            self.assertEqual(response_cache.get_generations(['tenants.Tenant']), acme)
+            response_cache.invalidate_models('tenants.Tenant')
+            self.assertNotEqual(response_cache.get_generations(['tenants.Tenant']), acme)
+
+    def test_invalidation_waits_for_the_commit(self):
+        before = response_cache.get_generations(['tenants.Tenant'])
+        in_transaction = mock.Mock(in_atomic_block=True)
+        with mock.patch.object(response_cache.transaction, 'get_connection', return_value=in_transaction), \
+                mock.patch.object(response_cache.transaction, 'on_commit') as on_commit:
+            response_cache.invalidate_models(Tenant, using='shard1')
+        self.assertEqual(response_cache.get_generations(['tenants.Tenant']), before)
+        [invalidate], kwargs = on_commit.call_args
+        self.assertEqual(kwargs, {'using': 'shard1'})
+        invalidate()
+        self.assertNotEqual(response_cache.get_generations(['tenants.Tenant']), before)
+
+    def test_last_login_saves_are_ignored(self):
+        before = response_cache.get_generations(['users.CustomUser'])
+        invalidate_cached_responses(CustomUser, using='default', update_fields=frozenset({'last_login'}))
+        self.assertEqual(response_cache.get_generations(['users.CustomUser']), before)
+        invalidate_cached_responses(CustomUser, using='default', update_fields=frozenset({'last_login', 'email'}))
+        self.assertNotEqual(response_cache.get_generations(['users.CustomUser']), before)
+
+
+class SessionSettingsTests(SimpleTestCase):
+    """core.db.backend applies the tenant's session settings once per switch"""
+
+    def setUp(self):
+        default = connections['default']
+        self.wrapper = type(default)(default.settings_dict, 'default')
+        self.wrapper.connection = mock.MagicMock()
+        self.wrapper.tenant = mock.Mock(db_session_settings={'statement_timeout': '15s'})
+        self.execute = self.wrapper.connection.cursor.return_value.__enter__.return_value.execute
+
+    def test_settings_are_applied_once(self):
+        self.wrapper._apply_session_settings()
+        self.assertTrue(self.wrapper._session_settings_checked)
+        self.assertEqual(self.wrapper._applied_session_settings, {'statement_timeout': '15s'})
+        self.assertIn('set_config', self.execute.call_args.args[0])
+
+        self.wrapper._session_settings_checked = False
+        self.wrapper._apply_session_settings()
+        self.assertEqual(self.execute.call_count, 1)
+
+    def test_failure_leaves_the_settings_unknown(self):
+        # e.g. inside a transaction that already failed
+        self.execute.side_effect = DatabaseError('current transaction is aborted')
+        self.wrapper._apply_session_settings()
+        self.assertFalse(self.wrapper._session_settings_checked)
+        self.assertIsNone(self.wrapper._applied_session_settings)
+
+        self.execute.side_effect = None
+        self.wrapper._apply_session_settings()
+        self.assertTrue(self.wrapper._session_settings_checked)
+        self.assertEqual(self.execute.call_count, 2)
+
+
+class AdminCountTests(SimpleTestCase):
+    def test_filtered_querysets_are_counted_exactly(self):
+        # None makes EstimatedCountPaginator fall back to COUNT(*); no query is run here
+        self.assertIsNone(estimated_count(CustomUser.objects.filter(email__icontains='acme')))
+        self.assertIsNone(estimated_count(CustomUser.objects.distinct()))
+
+    def test_lookahead_pages_know_if_more_follow(self):
+        paginator = LookaheadPaginator(list(range(45)), 20)
+        self.assertEqual([paginator.page(n).has_next() for n in (1, 2, 3)], [True, True, False])
+        self.assertEqual(list(paginator.page(3)), list(range(40, 45)))
+        self.assertFalse(LookaheadPaginator(list(range(40)), 20).page(2).has_next())
+        self.assertFalse(LookaheadPaginator([], 20).page(1).has_next())
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """FastJSONRenderer output against DRF's JSONRenderer"""
+
+    def assertSameOutput(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_same_output(self):
+        self.assertSameOutput({
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'name': 'Crème brûlée \u2028 \u2029 "quoted" </script>',
+            'created_at': timezone.make_aware(datetime.datetime(2026, 10, 1, 12, 30, 15, 123456)),
+            'day': datetime.date(2026, 10, 1),
+            'time': datetime.time(8, 15),
+            'duration': datetime.timedelta(hours=1),
+            'amount': decimal.Decimal('12.50'),
+            'label': gettext_lazy('English'),
+            'counts': [0, -1, 2 ** 63 - 1, 0.1, 1.5, None, True, False],
+            'nested': {'empty': {}, 'list': [], 1: 'non-string key'},
+        })
+        self.assertSameOutput([])
+        self.assertEqual(FastJSONRenderer().render(None), JSONRenderer().render(None))
+
+    def test_big_integers_fall_back(self):
+        self.assertSameOutput({'big': 2 ** 64, 'negative': -(2 ** 70)})
+
+    def test_non_finite_floats_render_as_null(self):
+        # Documented difference: the strict stock renderer refuses them
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'value': float('nan')})
+        self.assertEqual(FastJSONRenderer().render({'value': float('nan'), 'inf': float('inf')}),
+                         b'{"value":null,"inf":null}')
+
+
+def current_schema():
+    return connections['default'].schema_name, translation.get_language()
+
+
+class TenantContextTests(SimpleTestCase):
+    def setUp(self):
+        self.acme = Tenant(pk=1, schema_name='acme', name='Acme')
+        self.globex = Tenant(pk=2, schema_name='globex', name='Globex')
+
+    def test_restores_the_previous_tenant_and_language(self):
+        before = current_schema()
+        with translation.override('en'), context.tenant_context(self.acme, language='fr'):
+            self.assertEqual(current_schema(), ('acme', 'fr'))
+            with context.tenant_context(self.globex):
+                self.assertEqual(connections['default'].schema_name, 'globex')
+                self.assertEqual(context.get_current_context().tenant, self.globex)
+            self.assertEqual(current_schema(), ('acme', 'fr'))
+            self.assertEqual(context.get_current_context().tenant, self.acme)
+        self.assertEqual(current_schema(), before)
+        self.assertIsNone(context.get_current_context())
+
+    def test_restores_on_error(self):
+        before = (current_schema(), get_urlconf())
+        with self.assertRaises(ZeroDivisionError), context.tenant_context(self.acme, language='fr'):
+            1 / 0
+        self.assertEqual((current_schema(), get_urlconf()), before)
+
+    def test_nested_contexts_keep_the_request_id(self):
+        with context.tenant_context(self.acme, request_id='abc'):
+            with context.tenant_context(self.globex):
+                self.assertEqual(context.get_request_id(), 'abc')
+
+    def test_bind_runs_in_the_captured_context(self):
+        seen = []
+
+        def work():
+            seen.append((current_schema(), context.get_request_id()))
+
+        with context.tenant_context(self.acme, language='fr', request_id='abc'):
+            thread = threading.Thread(target=context.bind(context.closing_connections(work)))
+        thread.start()
+        thread.join()
+        self.assertEqual(seen, [(('acme', 'fr'), 'abc')])
+
+    def test_tenant_sync_to_async(self):
+        async def main():
+            async with context.tenant_context(self.acme, language='fr'):
+                return await context.tenant_sync_to_async(current_schema)()
+
+        self.assertEqual(asyncio.run(main()), ('acme', 'fr'))
+
+    def test_tenant_task_pickles_the_context(self):
+        with context.tenant_context(self.acme, language='fr', request_id='abc'):
+            task = pickle.loads(pickle.dumps(context.TenantTask(current_schema)))
+            other = context.TenantTask.for_tenant(self.globex, current_schema)
+        self.assertEqual((task.schema_name, task.language, task.request_id), ('acme', 'fr', 'abc'))
+        self.assertEqual(other.schema_name, 'globex')
+
+
+class FakeConnection:
+    """Enough of a psycopg2 connection for ConnectionPool"""
+
+    def __init__(self, healthy=True):
+        self.closed = 0
+        self.healthy = healthy
+        self.info = mock.Mock(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+        self.rollback = mock.Mock()
+
+    def close(self):
+        self.closed = 1
+
+    def cursor(self):
+        cursor = mock.MagicMock()
+        if not self.healthy:
+            cursor.__enter__.return_value.execute.side_effect = psycopg2.OperationalError('gone')
+        return cursor
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = ConnectionPool('default', max_size=2, timeout=0.05)
+        self.connect = mock.Mock(side_effect=FakeConnection)
+
+    def test_checks_connections_out_and_back_in(self):
+        first = self.pool.getconn(self.connect)
+        second = self.pool.getconn(self.connect)
+        self.assertEqual(self.pool.stats()['in_use'], 2)
+        self.pool.putconn(first)
+        self.pool.putconn(second)
+        # LIFO: the most recently returned connection is reused first
+        self.assertIs(self.pool.getconn(self.connect), second)
+        self.assertIs(self.pool.getconn(self.connect), first)
+        stats = self.pool.stats()
+        self.assertEqual((stats['connections_created'], stats['checkouts'], stats['in_use']), (2, 4, 2))
+
+    def test_full_pool_waits_then_times_out(self):
+        first = self.pool.getconn(self.connect)
+        self.pool.getconn(self.connect)
+        timer = threading.Timer(0.01, self.pool.putconn, [first])
+        timer.start()
+        self.assertIs(self.pool.getconn(self.connect), first)
+        timer.join()
+        with self.assertRaises(PoolTimeout), self.assertLogs('core.db.pool', 'WARNING'):
+            self.pool.getconn(self.connect)
+        self.assertEqual(self.connect.call_count, 2)
+
+    def test_open_transaction_is_rolled_back_on_return(self):
+        connection = self.pool.getconn(self.connect)
+        self.pool.record_search_path(connection, ['acme', 'public'])
+        connection.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+        self.pool.putconn(connection)
+        connection.rollback.assert_called_once_with()
+        # The rollback may have undone SET search_path
+        self.assertIsNone(self.pool.search_path_for(connection))
+
+    def test_broken_connections_are_replaced(self):
+        self.pool.check_interval = 0
+        broken = self.pool.getconn(lambda: FakeConnection(healthy=False))
+        self.pool.putconn(broken)
+        time.sleep(0.001)
+        connection = self.pool.getconn(self.connect)
+        self.assertIsNot(connection, broken)
+        self.assertTrue(broken.closed)
+        self.assertEqual(self.pool.stats()['health_check_failures'], 1)
+
+    def test_failed_connect_frees_its_slot(self):
+        with self.assertRaises(psycopg2.OperationalError):
+            self.pool.getconn(mock.Mock(side_effect=psycopg2.OperationalError('refused')))
+        self.pool.getconn(self.connect)
+        self.pool.getconn(self.connect)
+        self.assertEqual(self.pool.stats()['in_use'], 2)
+
+    def test_expired_connections_are_closed_on_return(self):
+        self.pool.max_lifetime = 0.001
+        connection = self.pool.getconn(self.connect)
+        time.sleep(0.002)
+        self.pool.putconn(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(self.pool.stats()['size'], 0)
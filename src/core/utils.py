@@ -1,12 +1,58 @@
-from django.utils.translation import activate
+import functools
 from django.conf import settings
 
+# Distinct Accept-Language headers remembered by parse_accept_language
+ACCEPT_LANGUAGE_CACHE_SIZE = 1024
+# Longer headers are not worth parsing (and would only churn the cache)
+ACCEPT_LANGUAGE_MAX_LENGTH = 256
+
+
+@functools.cache
+def supported_languages():
+    """Language codes from settings.LANGUAGES"""
+    return frozenset(code.lower() for code, _ in settings.LANGUAGES)
+
+
+@functools.lru_cache(maxsize=ACCEPT_LANGUAGE_CACHE_SIZE)
+def parse_accept_language(header):
+    """
+    Best supported language for an Accept-Language header, honoring q-values
+    and falling back from a regional tag (fr-CH) to its base language (fr).
+    Returns None when nothing acceptable is supported.
+    """
+    supported = supported_languages()
+    candidates = []
+    for position, part in enumerate(header.split(',')):
+        tag, _, params = part.strip().partition(';')
+        tag = tag.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if tag and tag != '*' and quality > 0:
+            # Stable order for equal q-values: header order wins
+            candidates.append((-quality, position, tag))
+
+    for _, _, tag in sorted(candidates):
+        if tag in supported:
+            return tag
+        base = tag.split('-', 1)[0]
+        if base in supported:
+            return base
+    return None
+
+
 def get_language_from_request(request):
-    """Get language from request header or default to settings"""
-    default_language = settings.LANGUAGE_CODE
-    language = request.headers.get('Accept-Language', default_language)
-    # Return first two characters (language code) and ensure it's supported
-    lang_code = language[:2].lower()
-    if lang_code in dict(settings.LANGUAGES):
-        return lang_code
-    return default_language
\ No newline at end of file
+    """Language from the language cookie, then Accept-Language, else settings.LANGUAGE_CODE"""
+    language = request.COOKIES.get(settings.LANGUAGE_COOKIE_NAME)
+    if language and language.lower() in supported_languages():
+        return language.lower()
+    header = request.headers.get('Accept-Language')
+    if header and len(header) <= ACCEPT_LANGUAGE_MAX_LENGTH:
+        language = parse_accept_language(header)
+        if language:
+            return language
+    return settings.LANGUAGE_CODE
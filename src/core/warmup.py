@@ -0,0 +1,70 @@
+"""
+Worker warm-up.
+
+Loads what every worker otherwise builds lazily on its first requests:
+translation catalogs, URL resolvers and the OpenAPI schema. DRF
+serializers are left out: their fields are rebuilt for every instance, so
+there is nothing to keep. Run it from gunicorn's `post_worker_init` hook (see gunicorn.conf.py)
+or at startup with WARMUP_ON_READY = True.
+"""
+import logging
+import time
+from django.conf import settings
+from django.urls import get_resolver
+from django.utils import translation
+from django.utils.translation import trans_real
+
+logger = logging.getLogger(__name__)
+
+
+def load_catalogs():
+    """Load the compiled .mo catalogs of every configured language"""
+    for code, _ in settings.LANGUAGES:
+        trans_real.translation(code)
+
+
+def load_url_resolvers():
+    """Populate the resolvers of the public and tenant urlconfs"""
+    resolvers = []
+    for urlconf in (settings.PUBLIC_SCHEMA_URLCONF, settings.ROOT_URLCONF):
+        resolver = get_resolver(urlconf)
+        for language, _ in settings.LANGUAGES:
+            # Reverse lookups are populated per active language
+            with translation.override(language):
+                resolver.reverse_dict
+        resolvers.append(resolver)
+    return resolvers
+
+
+def load_schema():
+    """Load (or generate) the OpenAPI schema variants in the default language"""
+    from core.api.schema import preload_schemas
+
+    preload_schemas(settings.LANGUAGE_CODE)
+
+
+def warm_up():
+    """Run every warm-up step, log and return their durations in seconds"""
+    timings = {}
+    started = time.perf_counter()
+    steps = [
+        ('catalogs', load_catalogs),
+        ('url_resolvers', load_url_resolvers),
+    ]
+    if settings.WARMUP_SCHEMA:
+        steps.append(('schema', load_schema))
+
+    for name, step in steps:
+        step_started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            # A broken step must never keep the worker from serving
+            logger.exception("Warm-up step %s failed", name)
+        timings[name] = time.perf_counter() - step_started
+    timings['total'] = time.perf_counter() - started
+
+    logger.info("Warm-up done in %.3fs (%s)", timings['total'], ', '.join(
+        f"{name} {seconds:.3f}s" for name, seconds in timings.items() if name != 'total'
+    ))
+    return timings
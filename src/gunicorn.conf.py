@@ -0,0 +1,17 @@
+"""
+gunicorn settings, run from src/:
+
+    gunicorn -c gunicorn.conf.py budgenus.wsgi
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+
+
+def post_worker_init(worker):
+    """Warm each worker up before it accepts requests"""
+    from core.warmup import warm_up
+
+    timings = warm_up()
+    worker.log.info("Worker %s warmed up in %.3fs", worker.pid, timings['total'])
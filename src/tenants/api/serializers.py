@@ -1,10 +1,12 @@
 from rest_framework import serializers
-from django.utils.text import slugify
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
 from django.urls import reverse
 from tenants.models import Tenant, Domain, Invitation
+from core.api.rows import RowSerializer, format_date, format_datetime
+from core.context import run_in_background
 
 class DomainSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,7 +15,7 @@ class DomainSerializer(serializers.ModelSerializer):
         read_only_fields = ['tenant']
 
 class TenantSerializer(serializers.ModelSerializer):
-    domains = DomainSerializer(many=True, read_only=True)
+    domains = DomainSerializer(source='tenant_domains', many=True, read_only=True)
     is_on_trial = serializers.BooleanField(read_only=True)
     is_active = serializers.BooleanField(read_only=True)
     trial_days_remaining = serializers.SerializerMethodField()
@@ -36,21 +38,43 @@ class TenantSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """Create a new tenant with a primary domain"""
-        # Generate a unique schema name
-        base_schema = slugify(validated_data['name'])[:40]
-        schema_name = base_schema
-        
-        # Ensure schema name is unique
-        counter = 1
-        while Tenant.objects.filter(schema_name=schema_name).exists():
-            schema_name = f"{base_schema}-{counter}"
-            counter += 1
-        
-        validated_data['schema_name'] = schema_name
-        tenant = Tenant.objects.create(**validated_data)
-        tenant.start_trial()
+        with transaction.atomic():
+            # Allocate a unique schema name in one query
+            base_schema = Tenant.generate_schema_name(validated_data['name'])
+            validated_data['schema_name'] = Tenant.allocate_schema_name(base_schema)
+            tenant = Tenant.objects.create(**validated_data)
+            tenant.start_trial()
         return tenant
 
+class TenantRowSerializer(RowSerializer):
+    """Fast read-only equivalent of TenantSerializer for list pages"""
+    fields = ('id', 'schema_name', 'name', 'paid_until', 'trial_end_date', 'created_at')
+
+    def prefetch(self, rows):
+        """Load the domains of the whole page in one query"""
+        self.domains = {row['id']: [] for row in rows}
+        domains = Domain.objects.filter(tenant_id__in=self.domains).values_list('domain', 'is_primary', 'tenant_id')
+        for domain, is_primary, tenant_id in domains:
+            self.domains[tenant_id].append({'domain': domain, 'is_primary': is_primary, 'tenant': tenant_id})
+
+    def to_representation(self, row):
+        today = self.today
+        trial_end_date = row['trial_end_date']
+        paid_until = row['paid_until']
+        is_on_trial = bool(trial_end_date) and today <= trial_end_date
+        return {
+            'id': row['id'],
+            'schema_name': row['schema_name'],
+            'name': row['name'],
+            'paid_until': format_date(paid_until),
+            'trial_end_date': format_date(trial_end_date),
+            'is_on_trial': is_on_trial,
+            'is_active': today <= paid_until if paid_until else is_on_trial,
+            'trial_days_remaining': max(0, (trial_end_date - today).days) if trial_end_date else 0,
+            'domains': self.domains[row['id']],
+            'created_at': format_datetime(row['created_at'], self.tz),
+        }
+
 class InvitationSerializer(serializers.ModelSerializer):
     tenant_name = serializers.CharField(source='tenant.name', read_only=True)
     invited_by_name = serializers.CharField(source='invited_by.get_full_name', read_only=True)
@@ -98,10 +122,33 @@ class InvitationSerializer(serializers.ModelSerializer):
         The Team
         """
         
-        send_mail(
+        # SMTP off the request path, once the invitation is committed
+        transaction.on_commit(lambda: run_in_background(
+            send_mail,
             subject,
             message,
             settings.DEFAULT_FROM_EMAIL,
             [invitation.email],
             fail_silently=False,
-        )
+        ))
+
+class InvitationRowSerializer(RowSerializer):
+    """Fast read-only equivalent of InvitationSerializer for list pages"""
+    fields = (
+        'id', 'tenant_id', 'tenant__name', 'email', 'invited_by__first_name',
+        'invited_by__last_name', 'status', 'created_at', 'expires_at',
+    )
+
+    def to_representation(self, row):
+        expires_at = row['expires_at']
+        return {
+            'id': str(row['id']),
+            'tenant': row['tenant_id'],
+            'tenant_name': row['tenant__name'],
+            'email': row['email'],
+            'invited_by_name': f"{row['invited_by__first_name']} {row['invited_by__last_name']}".strip(),
+            'status': row['status'],
+            'created_at': format_datetime(row['created_at'], self.tz),
+            'expires_at': format_datetime(expires_at, self.tz),
+            'days_until_expiry': max(0, (expires_at - self.now).days) if expires_at else 0,
+        }
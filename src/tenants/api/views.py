@@ -2,24 +2,46 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from tenants.models import Tenant, Domain, Invitation
-from .serializers import TenantSerializer, DomainSerializer, InvitationSerializer
+from .serializers import (
+    TenantSerializer, DomainSerializer, InvitationSerializer,
+    TenantRowSerializer, InvitationRowSerializer
+)
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from core.cache import cached_response
+from core.api.mixins import ConditionalGetMixin, RowListMixin
+from tenants.stats import platform_summary
 
 class IsSuperUser(permissions.BasePermission):
     """Only allow superusers to access tenant management"""
     def has_permission(self, request, view):
         return request.user.is_superuser
 
-class TenantViewSet(viewsets.ModelViewSet):
+class TenantViewSet(ConditionalGetMixin, RowListMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing tenants
     """
     queryset = Tenant.objects.all()
     serializer_class = TenantSerializer
+    row_serializer_class = TenantRowSerializer
     permission_classes = [permissions.IsAuthenticated, IsSuperUser]
+    related_validators = ('tenant_domains',)
+    replica_read_actions = ('stats',)
 
-class DomainViewSet(viewsets.ModelViewSet):
+    @cached_response(models=[Tenant, Domain])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response(models=[Tenant, Domain])
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Platform totals from the TenantStats summary (see tenants.stats)"""
+        return Response(platform_summary())
+
+class DomainViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing tenant domains
     """
@@ -33,12 +55,15 @@ class DomainViewSet(viewsets.ModelViewSet):
         tenant = get_object_or_404(Tenant, id=tenant_id)
         serializer.save(tenant=tenant)
 
-class InvitationViewSet(viewsets.ModelViewSet):
+class InvitationViewSet(ConditionalGetMixin, RowListMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing tenant invitations
     """
     serializer_class = InvitationSerializer
+    row_serializer_class = InvitationRowSerializer
     permission_classes = [permissions.IsAuthenticated]
+    related_validators = ('tenant', 'invited_by')
+    replica_read_actions = ('list', 'retrieve')
 
     def get_queryset(self):
         """Filter invitations based on user role"""
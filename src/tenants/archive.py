@@ -0,0 +1,199 @@
+"""
+Archival of cold tenant schemas.
+
+An archived tenant keeps its public-schema rows (Tenant, Domain) but its
+schema is dumped with `pg_dump --format=custom` to TENANT_ARCHIVE_DIR and
+dropped. Tenant.archiving_at is set before the dump starts, so the tenant
+answers 503 while it is archived and no write can land after the dump. The
+first request for an archived tenant starts a background rehydration and
+gets a 503 "warming up" response until the schema is back.
+"""
+import logging
+import os
+import subprocess
+import threading
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django_tenants.utils import get_public_schema_name, schema_context, schema_exists
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _pg_command(program, *args, using='default'):
+    """Command line and environment for a PostgreSQL client tool on database `using`"""
+    db = connections[using].settings_dict
+    env = {**os.environ, 'PGPASSWORD': str(db.get('PASSWORD') or '')}
+    command = [program, '--dbname', db['NAME'], '--no-password']
+    if db.get('HOST'):
+        command += ['--host', db['HOST']]
+    if db.get('PORT'):
+        command += ['--port', str(db['PORT'])]
+    if db.get('USER'):
+        command += ['--username', db['USER']]
+    return command + list(args), env
+
+
+def run_pg_tool(program, *args, using='default'):
+    """Run pg_dump/pg_restore against database `using`, return its stdout"""
+    command, env = _pg_command(program, *args, using=using)
+    result = subprocess.run(command, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ArchiveError(f"{program} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def dump_schema(tenant, path):
+    """Dump the tenant schema to `path` (compressed custom format) and verify the file"""
+    run_pg_tool('pg_dump', '--format=custom', '--compress=9', '--no-owner',
+                '--schema', tenant.schema_name, '--file', str(path), using=tenant.database)
+    # Refuse to go on with a dump pg_restore can't read back
+    run_pg_tool('pg_restore', '--list', str(path))
+
+
+def restore_schema(tenant, path, using):
+    """Restore a schema dump on database `using` and apply pending tenant migrations"""
+    # One transaction, so a failed restore leaves no partial schema behind
+    run_pg_tool('pg_restore', '--no-owner', '--single-transaction', str(path), using=using)
+    try:
+        call_command('migrate_schemas', schema_name=tenant.schema_name, database=using,
+                     interactive=False, verbosity=0)
+    except BaseException:
+        # Don't leave a restored but unmigrated schema for the next attempt to trip on
+        drop_schema(tenant.schema_name, using=using)
+        raise
+
+
+def drop_schema(schema_name, using):
+    target = connections[using]
+    with transaction.atomic(using=using), target.cursor() as cursor:
+        cursor.execute(f'DROP SCHEMA {target.ops.quote_name(schema_name)} CASCADE')
+
+
+def archive_candidates(idle_days=None):
+    """Inactive tenants (no paid or trial period) not seen for `idle_days`"""
+    from .models import Tenant
+
+    idle_days = settings.TENANT_ARCHIVE_AFTER_DAYS if idle_days is None else idle_days
+    cutoff = timezone.now() - timedelta(days=idle_days)
+    today = timezone.now().date()
+    return Tenant.objects.filter(
+        Q(last_active_at__lt=cutoff) | Q(last_active_at__isnull=True, created_at__lt=cutoff),
+        Q(paid_until__isnull=True) | Q(paid_until__lt=today),
+        Q(trial_end_date__isnull=True) | Q(trial_end_date__lt=today),
+        archived_at__isnull=True,
+        archiving_at__isnull=True,
+        moving_to='',
+    ).exclude(schema_name=get_public_schema_name())
+
+
+def archive_tenant(tenant):
+    """Dump the tenant schema to a compressed file, verify it, drop the schema"""
+    if tenant.is_archived:
+        raise ArchiveError(f"Tenant {tenant.schema_name} is already archived")
+
+    tenants = type(tenant).objects
+    with schema_context(get_public_schema_name()):
+        # Take the tenant offline first; the conditional update doubles as a
+        # lock against concurrent archives and shard moves
+        if not tenants.filter(
+            pk=tenant.pk, archived_at__isnull=True, archiving_at__isnull=True, moving_to='',
+        ).update(archiving_at=timezone.now()):
+            raise ArchiveError(f"Tenant {tenant.schema_name} is already being archived or moved")
+
+    directory = Path(settings.TENANT_ARCHIVE_DIR)
+    path = directory / f"{tenant.schema_name}-{timezone.now():%Y%m%d%H%M%S}.dump"
+    partial = path.with_suffix('.partial')
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        dump_schema(tenant, partial)
+        partial.rename(path)
+        drop_schema(tenant.schema_name, using=tenant.database)
+    except BaseException:
+        # The schema is still there: put the tenant back online
+        partial.unlink(missing_ok=True)
+        path.unlink(missing_ok=True)
+        with schema_context(get_public_schema_name()):
+            tenants.filter(pk=tenant.pk).update(archiving_at=None)
+        raise
+
+    archived_at = timezone.now()
+    with schema_context(get_public_schema_name()):
+        tenants.filter(pk=tenant.pk).update(archived_at=archived_at, archive_path=str(path), archiving_at=None)
+    tenant.archived_at, tenant.archive_path = archived_at, str(path)
+    logger.info("Archived tenant %s to %s", tenant.schema_name, path)
+    return path
+
+
+def restore_tenant(tenant):
+    """Restore an archived tenant schema and bring it up to date with migrations"""
+    if not tenant.is_archived:
+        return
+    path = tenant.archive_path
+    if schema_exists(tenant.schema_name, database=tenant.database):
+        # Left over by an attempt that died half way: the dump is the reference
+        logger.warning("Dropping partially restored schema %s", tenant.schema_name)
+        drop_schema(tenant.schema_name, using=tenant.database)
+    restore_schema(tenant, path, using=tenant.database)
+    with schema_context(get_public_schema_name()):
+        type(tenant).objects.filter(pk=tenant.pk).update(archived_at=None, archive_path='')
+    tenant.archived_at, tenant.archive_path = None, ''
+    logger.info("Restored tenant %s from %s", tenant.schema_name, path)
+
+
+def _rehydrate_lock_key(tenant):
+    return f'tenant-rehydrate:{tenant.schema_name}'
+
+
+def _rehydrate_failures_key(tenant):
+    return f'tenant-rehydrate-failures:{tenant.schema_name}'
+
+
+def rehydration_backoff(failures):
+    """Seconds to wait before retrying a restore that failed `failures` times in a row"""
+    return min(settings.TENANT_REHYDRATE_BACKOFF * 2 ** (failures - 1), settings.TENANT_REHYDRATE_MAX_BACKOFF)
+
+
+def request_rehydration(tenant):
+    """
+    Restore the tenant in a background thread unless a restore is already
+    running (in any process sharing the cache) or recently failed. Returns
+    immediately.
+
+    The lock is only released when the restore succeeds. After a failure it
+    is kept for an exponentially growing backoff, so a broken dump doesn't
+    start a new pg_restore on every request.
+    """
+    lock_key = _rehydrate_lock_key(tenant)
+    if not cache.add(lock_key, 1, settings.TENANT_REHYDRATE_LOCK_SECONDS):
+        return False
+
+    def rehydrate():
+        failures_key = _rehydrate_failures_key(tenant)
+        try:
+            with schema_context(get_public_schema_name()):
+                fresh = type(tenant).objects.get(pk=tenant.pk)
+                restore_tenant(fresh)
+        except Exception:
+            failures = cache.get(failures_key, 0) + 1
+            backoff = rehydration_backoff(failures)
+            cache.set(failures_key, failures, backoff + settings.TENANT_REHYDRATE_LOCK_SECONDS)
+            cache.set(lock_key, 'failed', backoff)
+            logger.exception("Failed to rehydrate tenant %s (attempt %d, next in %ds)",
+                             tenant.schema_name, failures, backoff)
+        else:
+            cache.delete_many([lock_key, failures_key])
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=rehydrate, name=f'rehydrate-{tenant.schema_name}', daemon=True).start()
+    return True
@@ -0,0 +1,285 @@
+"""
+Fan-out of a function over tenant schemas.
+
+for_each_tenant(fn) calls `fn(tenant, *args, **kwargs)` once per tenant, as
+that tenant (see core.context.tenant_context), on a thread or process pool:
+
+- `max_db_concurrency` bounds the tasks running at once on each database
+  shard, so a wide pool doesn't exhaust one server's connections;
+- `timeout` (seconds) is the budget of each task, counted once it holds
+  its shard slot. It becomes the statement_timeout of the tenant's queries,
+  and a task still running past it (stuck in Python, network I/O...) is
+  reported as timed out and abandoned: for_each_tenant stops waiting for it
+  and gives its shard slot to the next task;
+- `progress(result, done, total)` is called as each tenant finishes.
+
+Abandoned worker processes are terminated. Threads can't be stopped: an
+abandoned thread runs until `fn` returns and the interpreter waits for it
+at exit, so prefer process mode for code that may hang.
+
+In process mode `fn` (and its arguments and return value) must be picklable.
+"""
+import copy
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django_tenants.utils import get_public_schema_name, get_tenant_model, schema_context
+from core.context import TenantContext, TenantTask, bind, capture, closing_connections, get_current_context
+from core.db.timeouts import timeout_kind
+
+logger = logging.getLogger(__name__)
+
+MODES = ('thread', 'process')
+
+
+class TenantResult:
+    """Outcome of the function for one tenant"""
+    __slots__ = ('schema_name', 'value', 'error', 'timed_out', 'duration')
+
+    def __init__(self, schema_name, value=None, error=None, timed_out=False, duration=0.0):
+        self.schema_name = schema_name
+        self.value = value
+        self.error = error
+        self.timed_out = timed_out
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return self.error is None and not self.timed_out
+
+    def __repr__(self):
+        state = 'ok' if self.ok else 'timed out' if self.timed_out else 'failed'
+        return f'<TenantResult {self.schema_name} {state} {self.duration:.3f}s>'
+
+
+class FanoutResult:
+    """
+    Results of a for_each_tenant() run, in completion order. `abandoned`
+    lists the schemas whose task timed out and was still running on return.
+    """
+
+    def __init__(self, results, duration, abandoned=()):
+        self.results = results
+        self.duration = duration
+        self.abandoned = list(abandoned)
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    @property
+    def values(self):
+        """{schema_name: return value} of the tenants that succeeded"""
+        return {result.schema_name: result.value for result in self.results if result.ok}
+
+    @property
+    def failed(self):
+        return [result for result in self.results if not result.ok]
+
+
+def fanout_tenants(schemas=None, database=None):
+    """Tenants to fan out to: every live tenant schema, optionally filtered"""
+    with schema_context(get_public_schema_name()):
+        tenants = get_tenant_model().objects.exclude(schema_name=get_public_schema_name()).filter(
+            archived_at__isnull=True, archiving_at__isnull=True, moving_to='',
+        )
+        if schemas:
+            tenants = tenants.filter(schema_name__in=schemas)
+        if database:
+            tenants = tenants.filter(database=database)
+        return list(tenants.order_by('schema_name'))
+
+
+def _interleave_shards(tenants):
+    """Alternate between shards so the per-shard limit doesn't idle the pool"""
+    by_shard = {}
+    for tenant in tenants:
+        by_shard.setdefault(tenant.database, []).append(tenant)
+    return [
+        tenant for batch in itertools.zip_longest(*by_shard.values())
+        for tenant in batch if tenant is not None
+    ]
+
+
+def _run(fn, args, kwargs, semaphore, timeout, running):
+    """
+    One fan-out task, run in the tenant's context (thread or process).
+
+    `running` maps the schemas of the tasks holding their shard slot to their
+    start time (time.monotonic, comparable across processes). Whoever pops
+    the entry releases the slot: the task when it returns, or for_each_tenant
+    when it abandons the task.
+    """
+    tenant = get_current_context().tenant
+    if semaphore is not None:
+        semaphore.acquire()
+    if running is not None:
+        running[tenant.schema_name] = time.monotonic()
+    started = time.perf_counter()
+    result = TenantResult(tenant.schema_name)
+    try:
+        if timeout is not None:
+            # The job's budget replaces the tenant's request-time limit
+            tenant = copy.copy(tenant)
+            tenant.db_session_settings = {
+                **tenant.db_session_settings, 'statement_timeout': f'{int(timeout * 1000)}ms',
+            }
+            connections[tenant.database].set_tenant(tenant)
+        result.value = fn(tenant, *args, **kwargs)
+    except DatabaseError as e:
+        result.timed_out = timeout_kind(e) is not None
+        result.error = traceback.format_exc()
+    except Exception:
+        result.error = traceback.format_exc()
+    finally:
+        owned = running is None or running.pop(tenant.schema_name, None) is not None
+        if semaphore is not None and owned:
+            semaphore.release()
+    result.duration = time.perf_counter() - started
+    if timeout is not None and result.duration > timeout:
+        result.timed_out = True
+    return result
+
+
+def _overdue(pending, running, timeout):
+    """
+    (futures of the tasks past their budget, seconds until the next one is
+    due). Tasks not started yet are checked again after `timeout` seconds.
+    """
+    now = time.monotonic()
+    started = running.copy()
+    overdue, wait_for = [], timeout
+    for future, (tenant, _) in pending.items():
+        if tenant.schema_name not in started:
+            continue
+        remaining = started[tenant.schema_name] + timeout - now
+        if remaining <= 0:
+            overdue.append(future)
+        else:
+            wait_for = min(wait_for, remaining)
+    return overdue, wait_for
+
+
+def _abandon(lane):
+    """Stop waiting for the task of a lane, terminating its worker process"""
+    # No public API to stop a worker process (and shutdown() forgets them)
+    processes = list((getattr(lane, '_processes', None) or {}).values())
+    lane.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def for_each_tenant(fn, *args, tenants=None, workers=None, mode='thread', max_db_concurrency=None,
+                    timeout=None, progress=None, **kwargs):
+    """
+    Call `fn(tenant, *args, **kwargs)` for every tenant of `tenants` (default:
+    fanout_tenants()) on a pool of `workers` threads or processes and return a
+    FanoutResult. Exceptions are caught per tenant and reported in the result.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    tenants = _interleave_shards(fanout_tenants() if tenants is None else list(tenants))
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tenants) or 1))
+    started = time.perf_counter()
+    run = capture()  # Language and request id shared by every task
+    results = []
+
+    shared_state = mode == 'process' and (max_db_concurrency or timeout is not None)
+    with (multiprocessing.Manager() if shared_state else nullcontext()) as manager:
+        semaphores = {}
+        if max_db_concurrency:
+            factory = manager.BoundedSemaphore if manager is not None else threading.BoundedSemaphore
+            semaphores = {
+                alias: factory(max_db_concurrency) for alias in {tenant.database for tenant in tenants}
+            }
+        running = None
+        if timeout is not None:
+            running = manager.dict() if manager is not None else {}
+
+        def report(result):
+            results.append(result)
+            if not result.ok:
+                logger.warning("Tenant %s %s", result.schema_name,
+                               'timed out' if result.timed_out else 'failed')
+            if progress is not None:
+                progress(result, len(results), len(tenants))
+
+        # One single-worker executor per lane, so an abandoned task can be
+        # left behind (its process terminated) without breaking the others
+        executor_class = ProcessPoolExecutor if mode == 'process' else ThreadPoolExecutor
+        lanes = set()
+        queue = iter(tenants)
+        pending = {}
+        abandoned = []
+
+        def submit(lane):
+            tenant = next(queue, None)
+            if tenant is None:
+                return
+            task_args = (fn, args, kwargs, semaphores.get(tenant.database), timeout, running)
+            if mode == 'process':
+                task = TenantTask.for_tenant(tenant, _run, *task_args)
+                task.request_id = run.request_id
+                future = lane.submit(task)
+            else:
+                context = TenantContext(tenant, run.language, settings.ROOT_URLCONF, run.request_id)
+                future = lane.submit(bind(closing_connections(_run), context), *task_args)
+            pending[future] = (tenant, lane)
+
+        def new_lane():
+            lane = executor_class(max_workers=1)
+            lanes.add(lane)
+            submit(lane)
+
+        try:
+            for _ in range(workers):
+                new_lane()
+
+            while pending:
+                wait_for = None
+                if timeout is not None:
+                    overdue, wait_for = _overdue(pending, running, timeout)
+                    for future in overdue:
+                        tenant, lane = pending[future]
+                        # Unless the task just returned and released its slot itself
+                        if running.pop(tenant.schema_name, None) is None:
+                            continue
+                        del pending[future]
+                        if tenant.database in semaphores:
+                            semaphores[tenant.database].release()
+                        lanes.discard(lane)
+                        _abandon(lane)
+                        abandoned.append(tenant.schema_name)
+                        report(TenantResult(tenant.schema_name, timed_out=True, duration=timeout))
+                        new_lane()
+                done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    tenant, lane = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception:
+                        # The task itself broke (unpicklable value, dead worker...)
+                        result = TenantResult(tenant.schema_name, error=traceback.format_exc())
+                        lanes.discard(lane)
+                        lane.shutdown(wait=False)
+                        lane = None
+                    report(result)
+                    if lane is None:
+                        new_lane()
+                    else:
+                        submit(lane)
+        finally:
+            for lane in lanes:
+                lane.shutdown(cancel_futures=True)
+
+    return FanoutResult(results, time.perf_counter() - started, abandoned)
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django_tenants.utils import get_public_schema_name, schema_context
+from tenants.archive import ArchiveError, archive_candidates, archive_tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Dump inactive tenant schemas to TENANT_ARCHIVE_DIR and drop them. "
+        "Archived tenants are restored on their next request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.TENANT_ARCHIVE_AFTER_DAYS,
+                            help='Archive tenants not seen for this many days')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Archive at most this many tenants')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='List the candidates without archiving them')
+
+    def handle(self, *args, **options):
+        with schema_context(get_public_schema_name()):
+            candidates = list(archive_candidates(options['days']).order_by('last_active_at')[:options['limit']])
+
+        archived = 0
+        for tenant in candidates:
+            if options['dry_run']:
+                self.stdout.write(f"{tenant.schema_name} (last active {tenant.last_active_at or 'never'})")
+                continue
+            try:
+                path = archive_tenant(tenant)
+            except ArchiveError as e:
+                self.stderr.write(self.style.ERROR(f"[{tenant.schema_name}] {e}"))
+                continue
+            archived += 1
+            self.stdout.write(f"[{tenant.schema_name}] archived to {path}")
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{archived} of {len(candidates)} tenants archived"))
@@ -0,0 +1,80 @@
+import json
+import os
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from tenants.fanout import MODES, fanout_tenants, for_each_tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Call a function for every tenant, as that tenant, on a thread or process pool. "
+        "The function is given by dotted path and called as fn(tenant, *args)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('function', help='Dotted path of the function, e.g. reports.jobs.monthly')
+        parser.add_argument('args', nargs='*', help='Extra string arguments for the function')
+        parser.add_argument('--schemas', nargs='+', default=None, help='Only these tenant schemas')
+        parser.add_argument('--database', default=None, help='Only the tenants of this shard')
+        parser.add_argument('--workers', type=int, default=None, help='Pool size (default: CPU count)')
+        parser.add_argument('--mode', choices=MODES, default='thread', help='Thread or process pool')
+        parser.add_argument('--max-db-concurrency', type=int, default=None,
+                            help='Tenants processed at once per database shard')
+        parser.add_argument('--timeout', type=float, default=None,
+                            help='Seconds per tenant, after which its task is abandoned; '
+                                 'also the statement_timeout of its queries')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            fn = import_string(options['function'])
+        except ImportError as e:
+            raise CommandError(e)
+        tenants = fanout_tenants(options['schemas'], options['database'])
+        if not tenants:
+            raise CommandError("No tenants to run on")
+
+        def progress(result, done, total):
+            if options['json']:
+                return
+            state = 'ok' if result.ok else 'timed out' if result.timed_out else 'failed'
+            self.stdout.write(f"[{done}/{total}] {result.schema_name} {state} ({result.duration:.2f}s)")
+
+        results = for_each_tenant(
+            fn, *options['args'], tenants=tenants, workers=options['workers'], mode=options['mode'],
+            max_db_concurrency=options['max_db_concurrency'], timeout=options['timeout'], progress=progress,
+        )
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'duration': results.duration,
+                'results': {
+                    result.schema_name: {
+                        'ok': result.ok, 'value': result.value, 'error': result.error,
+                        'timed_out': result.timed_out, 'duration': result.duration,
+                    }
+                    for result in results
+                },
+            }, indent=2, default=str))
+            self.exit_if_abandoned(results, options['mode'])
+            return
+
+        for result in results.failed:
+            self.stderr.write(self.style.ERROR(f"[{result.schema_name}] {result.error or 'timed out'}"))
+        style = self.style.SUCCESS if not results.failed else self.style.WARNING
+        self.stdout.write(style(
+            f"{len(results) - len(results.failed)} of {len(results)} tenants succeeded in {results.duration:.1f}s"
+        ))
+        self.exit_if_abandoned(results, options['mode'])
+
+    def exit_if_abandoned(self, results, mode):
+        """Abandoned threads can't be stopped and would keep the interpreter from exiting"""
+        if not results.abandoned or mode != 'thread':
+            return
+        self.stderr.write(self.style.ERROR(
+            f"Exiting without waiting for the abandoned tenants: {', '.join(results.abandoned)}"
+        ))
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(1)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django_tenants.utils import get_public_schema_name, schema_context
+from tenants.archive import ArchiveError
+from tenants.models import Tenant
+from tenants.shards import ShardMoveError, move_tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Move a tenant schema to another database alias listed in DATABASE_SHARDS. "
+        "The tenant answers 503 while its schema is copied."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('schema_name')
+        parser.add_argument('database', help='Target database alias')
+        parser.add_argument('--keep-source', action='store_true',
+                            help='Do not drop the schema on the source database')
+
+    def handle(self, *args, **options):
+        with schema_context(get_public_schema_name()):
+            try:
+                tenant = Tenant.objects.get(schema_name=options['schema_name'])
+            except Tenant.DoesNotExist:
+                raise CommandError(f"Tenant {options['schema_name']} does not exist")
+
+        source = tenant.database
+        try:
+            move_tenant(tenant, options['database'], keep_source=options['keep_source'])
+        except (ArchiveError, ShardMoveError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"[{tenant.schema_name}] moved from {source} to {tenant.database}"))
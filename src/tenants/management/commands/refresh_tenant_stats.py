@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from tenants.stats import refresh_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the TenantStats rows of tenants changed since the last run "
+        "(or older than TENANT_STATS_MAX_AGE). Run it periodically, e.g. every minute."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every tenant')
+
+    def handle(self, *args, **options):
+        refreshed = refresh_stats(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed the stats of {refreshed} tenants"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django_tenants.utils import get_public_schema_name, schema_context
+from tenants.archive import ArchiveError, restore_tenant
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = "Restore an archived tenant schema from its dump"
+
+    def add_arguments(self, parser):
+        parser.add_argument('schema_name')
+
+    def handle(self, *args, **options):
+        with schema_context(get_public_schema_name()):
+            try:
+                tenant = Tenant.objects.get(schema_name=options['schema_name'])
+            except Tenant.DoesNotExist:
+                raise CommandError(f"Tenant {options['schema_name']} does not exist")
+        if not tenant.is_archived:
+            raise CommandError(f"Tenant {tenant.schema_name} is not archived")
+
+        try:
+            restore_tenant(tenant)
+        except ArchiveError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"[{tenant.schema_name}] restored"))
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tenants", "0003_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenant",
+            name="last_active_at",
+            field=models.DateTimeField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.3 on 2026-10-19 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tenants", "0004_tenant_last_active_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenant",
+            name="archive_path",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="tenant",
+            name="archived_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.3 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tenants", "0005_tenant_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenant",
+            name="database",
+            field=models.CharField(
+                default="default",
+                editable=False,
+                help_text="Database alias (shard) holding the tenant schema. Use the move_tenant_shard command to change it.",
+                max_length=64,
+            ),
+        ),
+        migrations.AddField(
+            model_name="tenant",
+            name="moving_to",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.3 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tenants", "0006_tenant_database"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenant",
+            name="db_profile",
+            field=models.CharField(
+                default="standard",
+                help_text="Database session profile (TENANT_DB_PROFILES) applied to this tenant's connections",
+                max_length=32,
+            ),
+        ),
+        migrations.AddField(
+            model_name="tenant",
+            name="lock_timeout",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Milliseconds; overrides the profile (0 disables the timeout)",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="tenant",
+            name="statement_timeout",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Milliseconds; overrides the profile (0 disables the timeout)",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="tenant",
+            name="work_mem",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="Kilobytes; overrides the profile", null=True
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.3 on 2026-10-19 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tenants", "0007_tenant_db_settings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TenantStats",
+            fields=[
+                (
+                    "tenant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="tenants.tenant",
+                    ),
+                ),
+                ("member_count", models.PositiveIntegerField(default=0)),
+                ("active_member_count", models.PositiveIntegerField(default=0)),
+                ("pending_invitation_count", models.PositiveIntegerField(default=0)),
+                ("accepted_invitation_count", models.PositiveIntegerField(default=0)),
+                ("is_paid", models.BooleanField(default=False)),
+                ("is_on_trial", models.BooleanField(default=False)),
+                ("had_trial", models.BooleanField(default=False)),
+                ("dirty", models.BooleanField(db_index=True, default=True)),
+                ("refreshed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name_plural": "tenant stats",
+            },
+        ),
+    ]
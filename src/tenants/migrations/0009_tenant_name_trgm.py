@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-19 16:20
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("tenants", "0008_tenantstats"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name="tenant",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper(
+                        django.db.models.functions.comparison.Cast(
+                            "name", models.TextField()
+                        )
+                    ),
+                    name="gin_trgm_ops",
+                ),
+                name="tenant_name_trgm",
+            ),
+        ),
+    ]
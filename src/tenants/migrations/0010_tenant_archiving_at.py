@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tenants", "0009_tenant_name_trgm"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenant",
+            name="archiving_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
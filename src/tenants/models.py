@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import models, connection, transaction
+from django.db.models import Count, Max, Q
+from django.db.models.functions import Cast, Substr
 from django_tenants.models import TenantMixin, DomainMixin
 from django.conf import settings
 from datetime import datetime, timedelta
 from django.utils import timezone
+from django.utils.functional import cached_property
+from core.db.indexes import trigram_index
 import uuid
 import re
 
@@ -11,6 +15,32 @@ class Tenant(TenantMixin):
     paid_until = models.DateField(null=True, blank=True)
     trial_end_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    last_active_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+    archived_at = models.DateTimeField(null=True, blank=True, editable=False)
+    archive_path = models.CharField(max_length=255, blank=True, editable=False)
+    archiving_at = models.DateTimeField(null=True, blank=True, editable=False)
+    database = models.CharField(
+        max_length=64,
+        default='default',
+        editable=False,
+        help_text='Database alias (shard) holding the tenant schema. Use the move_tenant_shard command to change it.'
+    )
+    moving_to = models.CharField(max_length=64, blank=True, editable=False)
+    db_profile = models.CharField(
+        max_length=32,
+        default='standard',
+        help_text='Database session profile (TENANT_DB_PROFILES) applied to this tenant\'s connections'
+    )
+    statement_timeout = models.PositiveIntegerField(
+        null=True, blank=True, help_text='Milliseconds; overrides the profile (0 disables the timeout)'
+    )
+    lock_timeout = models.PositiveIntegerField(
+        null=True, blank=True, help_text='Milliseconds; overrides the profile (0 disables the timeout)'
+    )
+    work_mem = models.PositiveIntegerField(
+        null=True, blank=True, help_text='Kilobytes; overrides the profile'
+    )
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -21,6 +51,12 @@ class Tenant(TenantMixin):
     )
     auto_create_schema = True
 
+    class Meta:
+        indexes = [trigram_index('name', 'tenant_name_trgm')]
+
+    # Schema names that can never be allocated to a tenant
+    RESERVED_SCHEMA_NAMES = {'public', 'information_schema'}
+
     def __str__(self):
         return self.name
 
@@ -31,6 +67,22 @@ class Tenant(TenantMixin):
             return timezone.now().date() <= self.paid_until
         return self.is_on_trial
 
+    @cached_property
+    def db_session_settings(self):
+        """PostgreSQL session settings for this tenant: its profile plus overrides"""
+        profiles = settings.TENANT_DB_PROFILES
+        session = dict(profiles.get(self.db_profile, profiles['standard']))
+        for name, unit in (('statement_timeout', 'ms'), ('lock_timeout', 'ms'), ('work_mem', 'kB')):
+            value = getattr(self, name)
+            if value is not None:
+                session[name] = f'{value}{unit}'
+        return session
+
+    @property
+    def is_archived(self):
+        """Check if the tenant schema has been archived (see tenants.archive)"""
+        return self.archived_at is not None
+
     @property
     def is_on_trial(self):
         """Check if tenant is currently on trial"""
@@ -54,21 +106,18 @@ class Tenant(TenantMixin):
                 tenant_name = f"{user.first_name}'s workspace" if user.first_name else f"{user.email.split('@')[0]}'s workspace"
             print(f"[DEBUG] Using tenant name: {tenant_name}")
             
-            # Generate and clean schema name
-            schema_name = cls.generate_schema_name(tenant_name)
-            print(f"[DEBUG] Generated schema name: {schema_name}")
-            
-            # Check if schema name already exists
-            if cls.objects.filter(schema_name=schema_name).exists():
-                raise Exception("A tenant with this name already exists. Please choose a different organization name.")
-            
-            # Create tenant
-            tenant = cls.objects.create(
-                name=tenant_name,
-                schema_name=schema_name,
-                owner=user
-            )
-            print(f"[DEBUG] Tenant created successfully")
+            with transaction.atomic():
+                # Allocate a free schema name (adds a suffix on collision)
+                schema_name = cls.allocate_schema_name(cls.generate_schema_name(tenant_name))
+                print(f"[DEBUG] Allocated schema name: {schema_name}")
+
+                # Create tenant
+                tenant = cls.objects.create(
+                    name=tenant_name,
+                    schema_name=schema_name,
+                    owner=user
+                )
+                print(f"[DEBUG] Tenant created successfully")
             
             # Create domain
             domain_name = f"{schema_name}.{settings.DOMAIN}"
@@ -90,6 +139,41 @@ class Tenant(TenantMixin):
         schema_name = re.sub(r'[^a-zA-Z0-9]', '_', tenant_name.lower())[:50]
         return schema_name
 
+    @classmethod
+    def allocate_schema_name(cls, base_name):
+        """
+        Return `base_name` if it is free, otherwise `base_name_<n>` with the
+        next suffix after the highest one in use.
+
+        The highest suffix comes from a single aggregate over the schema_name
+        prefix (served by the varchar_pattern_ops index Django creates for
+        unique CharFields on PostgreSQL). A transaction-level advisory lock on
+        the base name serializes concurrent signups, so call this inside the
+        transaction that creates the tenant; the unique index on schema_name
+        remains the last guard.
+        """
+        base_name = base_name.lower()[:50]
+        if not base_name or not base_name[0].isalpha() or base_name.startswith('pg_'):
+            base_name = f't_{base_name}'[:50]
+
+        if connection.vendor == 'postgresql' and connection.in_atomic_block:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [f'schema_name:{base_name}'])
+
+        suffix_pattern = rf'^{re.escape(base_name)}_[0-9]{{1,9}}$'
+        usage = cls.objects.filter(
+            Q(schema_name=base_name) | Q(schema_name__startswith=f'{base_name}_')
+        ).aggregate(
+            base_taken=Count('pk', filter=Q(schema_name=base_name)),
+            max_suffix=Max(
+                Cast(Substr('schema_name', len(base_name) + 2), models.BigIntegerField()),
+                filter=Q(schema_name__regex=suffix_pattern),
+            ),
+        )
+        if not usage['base_taken'] and base_name not in cls.RESERVED_SCHEMA_NAMES:
+            return base_name
+        return f"{base_name}_{(usage['max_suffix'] or 0) + 1}"
+
 class Domain(DomainMixin):
     """
     Domain model for tenant.
@@ -99,6 +183,7 @@ class Domain(DomainMixin):
         on_delete=models.CASCADE, 
         related_name='tenant_domains'
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
 class Invitation(models.Model):
     """
@@ -120,6 +205,7 @@ class Invitation(models.Model):
     )
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     expires_at = models.DateTimeField()
     accepted_at = models.DateTimeField(null=True, blank=True)
 
@@ -158,3 +244,26 @@ class Invitation(models.Model):
         if not self.expires_at:
             self.expires_at = timezone.now() + timedelta(days=7)
         super().save(*args, **kwargs)
+
+
+class TenantStats(models.Model):
+    """
+    Per-tenant counts for platform statistics, kept in the public schema and
+    refreshed incrementally by tenants.stats (refresh_tenant_stats command).
+    """
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    member_count = models.PositiveIntegerField(default=0)
+    active_member_count = models.PositiveIntegerField(default=0)
+    pending_invitation_count = models.PositiveIntegerField(default=0)
+    accepted_invitation_count = models.PositiveIntegerField(default=0)
+    is_paid = models.BooleanField(default=False)
+    is_on_trial = models.BooleanField(default=False)
+    had_trial = models.BooleanField(default=False)
+    dirty = models.BooleanField(default=True, db_index=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'tenant stats'
+
+    def __str__(self):
+        return f"Stats of {self.tenant_id}"
@@ -0,0 +1,51 @@
+"""
+Moving tenant schemas between shards (DATABASE_SHARDS).
+
+Tenant.moving_to is set for the duration of the copy, which makes
+ArchivedTenantMiddleware answer the tenant's requests with 503 + Retry-After,
+so no write can land on the source schema after it was dumped.
+"""
+import logging
+import tempfile
+from pathlib import Path
+from django_tenants.utils import get_public_schema_name, schema_context
+from core.db.routers import get_shard_aliases
+from .archive import drop_schema, dump_schema, restore_schema
+
+logger = logging.getLogger(__name__)
+
+
+class ShardMoveError(Exception):
+    pass
+
+
+def move_tenant(tenant, target, keep_source=False):
+    """Copy the tenant schema to shard `target`, switch Tenant.database, drop the source"""
+    source = tenant.database
+    if target not in get_shard_aliases():
+        raise ShardMoveError(f"{target} is not in DATABASE_SHARDS")
+    if target == source:
+        raise ShardMoveError(f"Tenant {tenant.schema_name} already lives on {target}")
+    if tenant.is_archived:
+        raise ShardMoveError(f"Tenant {tenant.schema_name} is archived")
+
+    tenants = type(tenant).objects
+    with schema_context(get_public_schema_name()):
+        # The conditional update doubles as a lock against concurrent moves
+        if not tenants.filter(pk=tenant.pk, moving_to='', archiving_at__isnull=True).update(moving_to=target):
+            raise ShardMoveError(f"Tenant {tenant.schema_name} is already being moved or archived")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / f'{tenant.schema_name}.dump'
+            dump_schema(tenant, path)
+            restore_schema(tenant, path, using=target)
+        with schema_context(get_public_schema_name()):
+            tenants.filter(pk=tenant.pk).update(database=target)
+        tenant.database = target
+    finally:
+        with schema_context(get_public_schema_name()):
+            tenants.filter(pk=tenant.pk).update(moving_to='')
+    logger.info("Moved tenant %s from %s to %s", tenant.schema_name, source, target)
+
+    if not keep_source:
+        drop_schema(tenant.schema_name, using=source)
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django_tenants.utils import get_public_schema_name
+from .models import Invitation, Tenant
+from .stats import mark_dirty
+
+
+def _mark_stats_dirty(tenant_id):
+    # TenantStats aggregates the public-schema rows only
+    if tenant_id is not None and connection.schema_name == get_public_schema_name():
+        mark_dirty(tenant_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender=Invitation)
+@receiver(post_delete, sender=Invitation)
+def mark_tenant_stats_dirty(sender, instance, **kwargs):
+    """Flag the stats of the tenant a user or invitation belongs to"""
+    _mark_stats_dirty(instance.tenant_id)
+
+
+@receiver(post_save, sender=Tenant)
+def mark_own_stats_dirty(sender, instance, created, **kwargs):
+    if not created:
+        _mark_stats_dirty(instance.pk)
@@ -0,0 +1,117 @@
+"""
+Platform statistics from the TenantStats summary table.
+
+Writes to users, invitations and tenants in the public schema flag the
+tenant's stats row dirty (tenants.signals); refresh_stats() recomputes only
+dirty, missing and stale rows with grouped queries, so dashboards and the
+admin read one small table instead of aggregating users and invitations.
+Run it periodically with the refresh_tenant_stats command.
+"""
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from django_tenants.utils import get_public_schema_name, schema_context
+from .models import Invitation, Tenant, TenantStats
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+COUNT_FIELDS = ('member_count', 'active_member_count', 'pending_invitation_count', 'accepted_invitation_count')
+STATUS_FIELDS = ('is_paid', 'is_on_trial', 'had_trial')
+
+
+def mark_dirty(tenant_id):
+    """Flag the tenant's stats for the next refresh (no-op if already flagged or missing)"""
+    TenantStats.objects.filter(tenant_id=tenant_id, dirty=False).update(dirty=True)
+
+
+def stale_tenant_ids(full=False):
+    """Tenants whose stats are dirty, missing or older than TENANT_STATS_MAX_AGE"""
+    tenants = Tenant.objects.exclude(schema_name=get_public_schema_name())
+    if not full:
+        tenants = tenants.filter(
+            Q(stats__isnull=True) | Q(stats__dirty=True)
+            | Q(stats__refreshed_at__lt=timezone.now() - timedelta(seconds=settings.TENANT_STATS_MAX_AGE))
+        )
+    return list(tenants.order_by('pk').values_list('pk', flat=True))
+
+
+def _grouped_counts(queryset, **counts):
+    rows = queryset.order_by().values('tenant_id').annotate(**counts)
+    return {row.pop('tenant_id'): row for row in rows}
+
+
+def _compute(tenant_ids, now):
+    members = _grouped_counts(
+        get_user_model().objects.filter(tenant_id__in=tenant_ids),
+        member_count=Count('pk'),
+        active_member_count=Count('pk', filter=Q(is_active=True)),
+    )
+    invitations = _grouped_counts(
+        Invitation.objects.filter(tenant_id__in=tenant_ids),
+        pending_invitation_count=Count('pk', filter=Q(status=Invitation.Status.PENDING, expires_at__gt=now)),
+        accepted_invitation_count=Count('pk', filter=Q(status=Invitation.Status.ACCEPTED)),
+    )
+    today = now.date()
+    stats = []
+    for pk, paid_until, trial_end_date in Tenant.objects.filter(pk__in=tenant_ids).values_list(
+        'pk', 'paid_until', 'trial_end_date'
+    ):
+        stats.append(TenantStats(
+            tenant_id=pk,
+            **{field: 0 for field in COUNT_FIELDS},
+            **members.get(pk, {}),
+            **invitations.get(pk, {}),
+            is_paid=paid_until is not None and today <= paid_until,
+            is_on_trial=trial_end_date is not None and today <= trial_end_date,
+            had_trial=trial_end_date is not None,
+            dirty=False,
+            refreshed_at=now,
+        ))
+    return stats
+
+
+def refresh_stats(full=False):
+    """Recompute the stale TenantStats rows (all of them with `full`), return how many"""
+    refreshed = 0
+    with schema_context(get_public_schema_name()):
+        tenant_ids = stale_tenant_ids(full)
+        for start in range(0, len(tenant_ids), BATCH_SIZE):
+            batch = tenant_ids[start:start + BATCH_SIZE]
+            # Clear the flags first: a write during the refresh flags the row again
+            TenantStats.objects.filter(tenant_id__in=batch, dirty=True).update(dirty=False)
+            stats = _compute(batch, timezone.now())
+            TenantStats.objects.bulk_create(
+                stats,
+                update_conflicts=True,
+                unique_fields=['tenant'],
+                update_fields=[*COUNT_FIELDS, *STATUS_FIELDS, 'refreshed_at'],
+            )
+            refreshed += len(stats)
+    logger.info("Refreshed the stats of %d tenants", refreshed)
+    return refreshed
+
+
+def platform_summary():
+    """Totals over every tenant's stats, for the internal stats endpoint"""
+    with schema_context(get_public_schema_name()):
+        summary = TenantStats.objects.aggregate(
+            tenants=Count('pk'),
+            paid_tenants=Count('pk', filter=Q(is_paid=True)),
+            trial_tenants=Count('pk', filter=Q(is_on_trial=True)),
+            had_trial=Count('pk', filter=Q(had_trial=True)),
+            converted_trials=Count('pk', filter=Q(had_trial=True, is_paid=True)),
+            members=Sum('member_count', default=0),
+            active_members=Sum('active_member_count', default=0),
+            pending_invitations=Sum('pending_invitation_count', default=0),
+            accepted_invitations=Sum('accepted_invitation_count', default=0),
+            dirty=Count('pk', filter=Q(dirty=True)),
+        )
+        oldest = TenantStats.objects.order_by('refreshed_at').values_list('refreshed_at', flat=True).first()
+    had_trial = summary.pop('had_trial')
+    summary['trial_conversion_rate'] = summary['converted_trials'] / had_trial if had_trial else None
+    summary['refreshed_at'] = oldest
+    return summary
@@ -0,0 +1,282 @@
+import datetime
+import functools
+import threading
+import time
+import uuid
+from unittest import mock
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from core.context import get_current_context
+from tenants import archive, stats
+from tenants.fanout import _interleave_shards, for_each_tenant
+from tenants.api.serializers import (
+    InvitationRowSerializer, InvitationSerializer, TenantRowSerializer, TenantSerializer,
+)
+from tenants.models import Domain, Invitation, Tenant, TenantStats
+from users.models import CustomUser
+
+
+def values_row(instance, lookups):
+    """What `.values(*lookups)` returns for a saved instance"""
+    def resolve(lookup):
+        try:
+            return functools.reduce(getattr, lookup.split('__'), instance)
+        except AttributeError:
+            return None  # Through a null foreign key
+    return {lookup: resolve(lookup) for lookup in lookups}
+
+
+class SyncThread:
+    """threading.Thread stand-in running the target on start()"""
+
+    def __init__(self, target, name=None, daemon=None):
+        self.target = target
+
+    def start(self):
+        self.target()
+
+
+@override_settings(TENANT_REHYDRATE_BACKOFF=60, TENANT_REHYDRATE_MAX_BACKOFF=3600)
+class RehydrationTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant(pk=1, schema_name='acme')
+        patches = [
+            mock.patch.object(archive.threading, 'Thread', SyncThread),
+            mock.patch.object(Tenant.objects, 'get', return_value=self.tenant),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_success_releases_the_lock(self):
+        with mock.patch.object(archive, 'restore_tenant') as restore:
+            self.assertTrue(archive.request_rehydration(self.tenant))
+            self.assertTrue(archive.request_rehydration(self.tenant))
+        self.assertEqual(restore.call_count, 2)
+
+    def test_failure_backs_off(self):
+        with mock.patch.object(archive, 'restore_tenant', side_effect=archive.ArchiveError('boom')) as restore, \
+                self.assertLogs('tenants.archive', 'ERROR'):
+            self.assertTrue(archive.request_rehydration(self.tenant))
+            # Every following request during the backoff gets its 503 without a new restore
+            self.assertFalse(archive.request_rehydration(self.tenant))
+            self.assertFalse(archive.request_rehydration(self.tenant))
+        self.assertEqual(restore.call_count, 1)
+        self.assertEqual(cache.get(archive._rehydrate_failures_key(self.tenant)), 1)
+
+    def test_backoff_grows(self):
+        self.assertEqual([archive.rehydration_backoff(n) for n in (1, 2, 3, 10)], [60, 120, 240, 3600])
+
+
+class RowSerializerParityTests(SimpleTestCase):
+    """Row serializers must render exactly what their ModelSerializer renders"""
+
+    def setUp(self):
+        now = timezone.now()
+        self.tenant = Tenant(
+            pk=1, schema_name='acme', name='Acme', created_at=now - datetime.timedelta(days=3),
+            trial_end_date=now.date() + datetime.timedelta(days=10),
+        )
+        self.domains = [
+            Domain(pk=1, domain='acme.example.com', is_primary=True, tenant=self.tenant),
+            Domain(pk=2, domain='acme.example.org', is_primary=False, tenant=self.tenant),
+        ]
+
+    def assertSameTenantOutput(self):
+        self.tenant._prefetched_objects_cache = {'tenant_domains': self.domains}
+        domains = mock.Mock()
+        domains.values_list.return_value = [(d.domain, d.is_primary, d.tenant_id) for d in self.domains]
+        with mock.patch.object(Domain.objects, 'filter', return_value=domains):
+            rows = TenantRowSerializer().serialize([values_row(self.tenant, TenantRowSerializer.fields)])
+        self.assertEqual(rows, [TenantSerializer(self.tenant).data])
+
+    def test_tenant_on_trial(self):
+        self.assertSameTenantOutput()
+
+    def test_paid_tenant_without_domains(self):
+        self.tenant.paid_until = timezone.now().date() - datetime.timedelta(days=1)
+        self.tenant.trial_end_date = None
+        self.domains = []
+        self.assertSameTenantOutput()
+
+    def test_invitation(self):
+        invitation = Invitation(
+            id=uuid.uuid4(), tenant=self.tenant, email='bob@example.com', status=Invitation.Status.PENDING,
+            invited_by=CustomUser(pk=1, first_name='Alice', last_name=''),
+            created_at=timezone.now(), expires_at=timezone.now() + datetime.timedelta(days=5, hours=1),
+        )
+        rows = InvitationRowSerializer().serialize([values_row(invitation, InvitationRowSerializer.fields)])
+        self.assertEqual(rows, [InvitationSerializer(invitation).data])
+
+
+class QueryCanceled(Exception):
+    pgcode = '57014'
+
+
+def hang_in_first_tenant(tenant):
+    """Module level: picklable for the process pool"""
+    if tenant.schema_name == 'tenant1':
+        time.sleep(60)
+    return tenant.schema_name
+
+
+class FanoutTests(SimpleTestCase):
+    def setUp(self):
+        self.tenants = [Tenant(pk=n, schema_name=f'tenant{n}', name=f'Tenant {n}') for n in range(1, 7)]
+
+    def test_reports_failures_per_tenant(self):
+        def work(tenant):
+            if tenant.schema_name == 'tenant2':
+                raise ValueError('broken tenant')
+            # Runs as the tenant
+            return get_current_context().schema_name
+
+        with self.assertLogs('tenants.fanout', 'WARNING'):
+            result = for_each_tenant(work, tenants=self.tenants, workers=3)
+        self.assertEqual(len(result), 6)
+        self.assertEqual(result.values, {t.schema_name: t.schema_name for t in self.tenants if t.pk != 2})
+        [failed] = result.failed
+        self.assertEqual(failed.schema_name, 'tenant2')
+        self.assertFalse(failed.timed_out)
+        self.assertIn('broken tenant', failed.error)
+
+    def test_timeouts(self):
+        def work(tenant, slow):
+            self.assertEqual(tenant.db_session_settings['statement_timeout'], '50ms')
+            if tenant.schema_name == slow:
+                time.sleep(0.1)
+            if tenant.schema_name == 'tenant1':
+                raise DatabaseError('canceling statement due to statement timeout') from QueryCanceled()
+
+        with self.assertLogs('tenants.fanout', 'WARNING'):
+            result = for_each_tenant(work, 'tenant3', tenants=self.tenants[:3], timeout=0.05)
+        self.assertEqual({r.schema_name: r.timed_out for r in result}, {
+            'tenant1': True,  # Cancelled by the statement_timeout
+            'tenant2': False,
+            'tenant3': True,  # Ran past the budget
+        })
+
+    def test_stuck_tasks_are_abandoned(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def work(tenant):
+            if tenant.schema_name == 'tenant1':
+                release.wait(60)  # Stuck outside the database
+            return tenant.schema_name
+
+        started = time.monotonic()
+        with self.assertLogs('tenants.fanout', 'WARNING'):
+            # A single shard slot: the others only run once tenant1 gives it up
+            result = for_each_tenant(work, tenants=self.tenants[:3], workers=1, max_db_concurrency=1, timeout=0.05)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(result.abandoned, ['tenant1'])
+        self.assertEqual([(r.schema_name, r.timed_out) for r in result], [
+            ('tenant1', True), ('tenant2', False), ('tenant3', False),
+        ])
+
+    def test_stuck_processes_are_terminated(self):
+        started = time.monotonic()
+        # Forked workers inherit the patch: no database lookup of the tenant
+        with mock.patch('core.context.get_tenant', lambda schema_name: Tenant(schema_name=schema_name)), \
+                self.assertLogs('tenants.fanout', 'WARNING'):
+            result = for_each_tenant(hang_in_first_tenant, tenants=self.tenants[:2], workers=1, mode='process',
+                                     timeout=0.5)
+        self.assertLess(time.monotonic() - started, 30)
+        self.assertEqual(result.abandoned, ['tenant1'])
+        self.assertEqual(result.values, {'tenant2': 'tenant2'})
+
+    def test_limits_concurrency_per_shard(self):
+        lock = threading.Lock()
+        running, peak = {}, {}
+
+        def work(tenant):
+            with lock:
+                running[tenant.database] = running.get(tenant.database, 0) + 1
+                peak[tenant.database] = max(peak.get(tenant.database, 0), running[tenant.database])
+            time.sleep(0.02)
+            with lock:
+                running[tenant.database] -= 1
+
+        for tenant in self.tenants[3:]:
+            tenant.database = 'shard1'
+        progress = mock.Mock()
+        # No real 'shard1' connection is needed to select a tenant
+        with mock.patch('core.context.connections'), mock.patch('core.db.routers.connections'):
+            for_each_tenant(work, tenants=self.tenants, workers=6, max_db_concurrency=2, progress=progress)
+        self.assertEqual(peak, {'default': 2, 'shard1': 2})
+        self.assertEqual([call.args[1:] for call in progress.call_args_list], [(n, 6) for n in range(1, 7)])
+
+    def test_interleaves_shards(self):
+        for tenant in self.tenants[:2]:
+            tenant.database = 'shard1'
+        self.assertEqual(
+            [t.schema_name for t in _interleave_shards(self.tenants)],
+            ['tenant1', 'tenant3', 'tenant2', 'tenant4', 'tenant5', 'tenant6'],
+        )
+
+
+class TenantStatsTests(TestCase):
+    def setUp(self):
+        # bulk_create: no schema is created for the tenant
+        [self.tenant] = Tenant.objects.bulk_create([Tenant(schema_name='acme', name='Acme')])
+
+    def get_stats(self):
+        return TenantStats.objects.get(tenant=self.tenant)
+
+    def test_refresh_counts_members(self):
+        CustomUser.objects.create(email='alice@example.com', tenant=self.tenant)
+        CustomUser.objects.create(email='bob@example.com', tenant=self.tenant, is_active=False)
+        self.assertEqual(stats.refresh_stats(), 1)
+        row = self.get_stats()
+        self.assertEqual((row.member_count, row.active_member_count, row.dirty), (2, 1, False))
+        # Nothing changed since
+        self.assertEqual(stats.refresh_stats(), 0)
+
+    def test_write_during_refresh_keeps_the_dirty_flag(self):
+        stats.refresh_stats()
+        compute = stats._compute
+
+        def compute_then_write(tenant_ids, now):
+            result = compute(tenant_ids, now)
+            # A concurrent request, after the counts were read
+            CustomUser.objects.create(email='late@example.com', tenant=self.tenant)
+            return result
+
+        CustomUser.objects.create(email='alice@example.com', tenant=self.tenant)
+        with mock.patch.object(stats, '_compute', side_effect=compute_then_write):
+            stats.refresh_stats()
+        row = self.get_stats()
+        self.assertEqual(row.member_count, 1)
+        self.assertTrue(row.dirty)
+
+        stats.refresh_stats()
+        row = self.get_stats()
+        self.assertEqual((row.member_count, row.dirty), (2, False))
+
+
+class SchemaNameAllocationTests(TestCase):
+    def create(self, *schema_names):
+        # bulk_create: no schema is created for the tenants
+        Tenant.objects.bulk_create([Tenant(schema_name=name, name=name) for name in schema_names])
+
+    def test_free_name_is_kept(self):
+        self.create('acme_corp')
+        self.assertEqual(Tenant.allocate_schema_name('acme'), 'acme')
+
+    def test_takes_the_suffix_after_the_highest(self):
+        self.create('acme', 'acme_2', 'acme_10')
+        self.assertEqual(Tenant.allocate_schema_name('acme'), 'acme_11')
+
+    def test_ignores_names_that_only_share_the_prefix(self):
+        # Neither is a numeric suffix of 'acme'
+        self.create('acme', 'acme_corp', 'acme_corp_7')
+        self.assertEqual(Tenant.allocate_schema_name('acme'), 'acme_1')
+
+    def test_reserved_and_invalid_names(self):
+        self.assertEqual(Tenant.allocate_schema_name('public'), 'public_1')
+        self.assertEqual(Tenant.allocate_schema_name('pg_acme'), 't_pg_acme')
+        self.assertEqual(Tenant.allocate_schema_name(Tenant.generate_schema_name('42 Acme')), 't_42_acme')
@@ -1,13 +1,27 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
 from django.contrib.auth.password_validation import validate_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from users.models import Address
+from users.utils import ADDRESS_FIELDS
+from users.validators import address_validator
 from tenants.models import Tenant, Domain
+from core.api.rows import RowSerializer
+from core.cache import invalidate_models
 
 User = get_user_model()
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # Fallback language for the API (see core.authentication.LanguageJWTAuthentication)
+        token['preferred_language'] = user.preferred_language
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
         # Add extra responses here
@@ -60,6 +74,26 @@ class AddressSerializer(serializers.ModelSerializer):
         fields = ['country', 'state', 'city', 'address_line1', 
                  'address_line2', 'zip_code']
 
+    def validate(self, attrs):
+        # The rules of bulk updates (users.validators), on the submitted fields
+        errors = address_validator.errors(attrs, partial=True)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        return Address.objects.get_or_create_by_hash(**validated_data)
+
+    def update(self, instance, validated_data):
+        """
+        Addresses are shared by content: only the users in the `users` context
+        queryset move to the changed address, everyone else keeps theirs
+        """
+        address = Address.objects.change_for(instance, self.context['users'], **validated_data)
+        # Queryset updates don't send model signals
+        invalidate_models(User, Address)
+        return address
+
 class UserSerializer(serializers.ModelSerializer):
     address = AddressSerializer(required=False)
 
@@ -85,18 +119,162 @@ class UserSerializer(serializers.ModelSerializer):
 
         }
 
+    def validate_address(self, value):
+        # A user without an address needs a complete one, even in a partial update
+        if value and (self.instance is None or self.instance.address_id is None):
+            errors = address_validator.errors(value)
+            if errors:
+                raise serializers.ValidationError(errors)
+        return value
+
+    def update(self, instance, validated_data):
+        address_data = validated_data.pop('address', None)
+        user = super().update(instance, validated_data)
+        if address_data:
+            if user.address is None:
+                user.address = Address.objects.get_or_create_by_hash(**address_data)
+                user.save(update_fields=['address'])
+            else:
+                # Copy-on-write: the current row may be shared with other users
+                user.address = Address.objects.change_for(
+                    user.address, User.objects.filter(pk=user.pk), **address_data
+                )
+                invalidate_models(User, Address)
+        return user
+
     def create(self, validated_data):
         address_data = validated_data.pop('address', None)
         user = User.objects.create_user(**validated_data)
         
         if address_data:
-            address = Address.objects.create(**address_data)
+            address = Address.objects.get_or_create_by_hash(**address_data)
             user.address = address
             user.save()
             
         return user
 
+class UserRowSerializer(RowSerializer):
+    """Fast read-only equivalent of UserSerializer for list pages"""
+    fields = (
+        'id', 'email', 'first_name', 'last_name', 'phone_number', 'gender', 'address_id',
+        'address__country', 'address__state', 'address__city',
+        'address__address_line1', 'address__address_line2', 'address__zip_code',
+    )
+
+    def to_representation(self, row):
+        address = None
+        if row['address_id'] is not None:
+            address = {
+                'country': row['address__country'],
+                'state': row['address__state'],
+                'city': row['address__city'],
+                'address_line1': row['address__address_line1'],
+                'address_line2': row['address__address_line2'],
+                'zip_code': row['address__zip_code'],
+            }
+        return {
+            'id': row['id'],
+            'email': row['email'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'phone_number': row['phone_number'],
+            'gender': row['gender'],
+            'address': address,
+        }
+
 class UserDetailSerializer(UserSerializer):
     """Serializer for detailed user information"""
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + ['date_joined', 'last_login']
+
+class AddressChangeSerializer(AddressSerializer):
+    """Address fields of a bulk update, all optional"""
+    class Meta(AddressSerializer.Meta):
+        extra_kwargs = {field: {'required': False} for field in AddressSerializer.Meta.fields}
+
+    def validate(self, attrs):
+        # Validated for all changes at once by UserBulkUpdateSerializer
+        return attrs
+
+class UserBulkItemSerializer(serializers.Serializer):
+    """One user change of a bulk update"""
+    id = serializers.IntegerField()
+    preferred_language = serializers.ChoiceField(choices=settings.LANGUAGES, required=False)
+    is_active = serializers.BooleanField(required=False)
+    address = AddressChangeSerializer(required=False)
+
+class UserBulkUpdateSerializer(serializers.Serializer):
+    """
+    Validates many user changes at once and applies them with bulk_update in
+    a single transaction. Expects `queryset` (the users that may be changed)
+    in the context.
+    """
+    MAX_USERS = 1000
+
+    users = UserBulkItemSerializer(many=True, allow_empty=False, max_length=MAX_USERS)
+
+    def validate_users(self, changes):
+        ids = [change['id'] for change in changes]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Each user can only appear once.")
+
+        self.targets = self.context['queryset'].select_related('address').in_bulk(ids)
+        missing = [pk for pk in ids if pk not in self.targets]
+        if missing:
+            raise serializers.ValidationError(f"Unknown users: {', '.join(map(str, missing))}.")
+
+        # Validate the address changes in one pass with the rules of
+        # AddressSerializer: only the submitted fields, unless the user has no
+        # address yet and needs a complete one. Errors are reported at the
+        # index of their change.
+        errors = [{} for _ in changes]
+        for partial in (True, False):
+            positions, records = [], []
+            for index, change in enumerate(changes):
+                has_address = self.targets[change['id']].address_id is not None
+                if change.get('address') and has_address is partial:
+                    positions.append(index)
+                    records.append(change['address'])
+            for position, record_errors in address_validator.validate_many(records, partial).items():
+                errors[positions[position]] = {'address': record_errors}
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return changes
+
+    def save(self):
+        """Apply the validated changes, returns the updated users"""
+        now = timezone.now()
+        users, fields = [], {'updated_at'}
+        address_users, address_rows, previous_addresses = [], [], set()
+
+        for change in self.validated_data['users']:
+            user = self.targets[change['id']]
+            for field in ('preferred_language', 'is_active'):
+                if field in change:
+                    setattr(user, field, change[field])
+                    fields.add(field)
+            address_data = change.get('address')
+            if address_data:
+                # Addresses are shared by content: never edit one in place
+                current = {}
+                if user.address is not None:
+                    current = {field: getattr(user.address, field) for field in ADDRESS_FIELDS}
+                    previous_addresses.add(user.address_id)
+                address_rows.append({**current, **address_data})
+                address_users.append(user)
+                fields.add('address')
+            user.updated_at = now
+            users.append(user)
+
+        with transaction.atomic():
+            if address_rows:
+                addresses = Address.objects.bulk_get_or_create(address_rows)
+                for user, address in zip(address_users, addresses):
+                    user.address = address
+            User.objects.bulk_update(users, sorted(fields), batch_size=500)
+            if previous_addresses:
+                Address.objects.filter(pk__in=previous_addresses, users__isnull=True).delete()
+
+        # bulk_update doesn't send model signals
+        invalidate_models(User, Address)
+        return users
@@ -4,11 +4,15 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
-from django.db import utils as django_db_utils
+from django.db import transaction, utils as django_db_utils
+from django.utils import timezone
 from users.models import Address
+from core.cache import cached_response, invalidate_models
+from core.api.mixins import ConditionalGetMixin, RowListMixin
 from .serializers import (
     UserSerializer, UserDetailSerializer, AddressSerializer,
-    CustomTokenObtainPairSerializer, RegisterSerializer
+    CustomTokenObtainPairSerializer, RegisterSerializer, UserRowSerializer,
+    UserBulkUpdateSerializer
 )
 
 User = get_user_model()
@@ -57,13 +61,14 @@ class AuthViewSet(viewsets.GenericViewSet):
         except Exception:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-class PublicUserViewSet(viewsets.ReadOnlyModelViewSet):
+class PublicUserViewSet(RowListMixin, viewsets.ReadOnlyModelViewSet):
     """
     Public API endpoint for users (read-only)
     Used in public schema for user registration and profile viewing
     """
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    row_serializer_class = UserRowSerializer
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
@@ -72,14 +77,25 @@ class PublicUserViewSet(viewsets.ReadOnlyModelViewSet):
             return User.objects.filter(id=self.request.user.id)
         return User.objects.none()
 
-class TenantUserViewSet(viewsets.ModelViewSet):
+    @cached_response(models=[User, Address])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response(models=[User, Address])
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+class TenantUserViewSet(ConditionalGetMixin, RowListMixin, viewsets.ModelViewSet):
     """
     Tenant-specific API endpoint for users
     Used within tenant schema for user management
     """
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    row_serializer_class = UserRowSerializer
     permission_classes = [permissions.IsAuthenticated]
+    related_validators = ('address',)
+    replica_read_actions = ('list', 'retrieve')
 
     def get_serializer_class(self):
         if self.action in ['retrieve', 'update', 'partial_update']:
@@ -90,14 +106,41 @@ class TenantUserViewSet(viewsets.ModelViewSet):
         # In tenant context, users can only see users within their tenant
         return User.objects.filter(tenant=self.request.tenant)
 
-class AddressViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['patch'], url_path='bulk')
+    def bulk_update(self, request):
+        """Update many users of the tenant in one request"""
+        serializer = UserBulkUpdateSerializer(data=request.data, context={
+            'request': request,
+            'queryset': self.get_queryset(),
+        })
+        serializer.is_valid(raise_exception=True)
+        users = serializer.save()
+        return Response({'updated': len(users)})
+
+class AddressViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for addresses (tenant-specific)
     """
     queryset = Address.objects.all()
     serializer_class = AddressSerializer
     permission_classes = [permissions.IsAuthenticated]
+    replica_read_actions = ('list', 'retrieve')
 
     def get_queryset(self):
-        # Filter addresses to return only those belonging to the current tenant
-        return Address.objects.filter(user__tenant=self.request.tenant)
+        # Addresses used by the current tenant's users (a subquery: rows are shared)
+        return Address.objects.filter(pk__in=self.tenant_users().values('address_id'))
+
+    def tenant_users(self):
+        return User.objects.filter(tenant=self.request.tenant)
+
+    def get_serializer_context(self):
+        # Updates only move this tenant's users (see AddressSerializer.update)
+        return {**super().get_serializer_context(), 'users': self.tenant_users()}
+
+    def perform_destroy(self, instance):
+        """Detach the tenant's users; the row goes once no other user shares it"""
+        with transaction.atomic():
+            self.tenant_users().filter(address=instance).update(address=None, updated_at=timezone.now())
+            if not instance.users.exists():
+                instance.delete()
+        invalidate_models(User, Address)
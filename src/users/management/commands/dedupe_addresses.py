@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from users.models import Address, CustomUser
+from users.utils import deduplicate_addresses
+
+
+class Command(BaseCommand):
+    help = (
+        "Normalize addresses, refresh their content hash and merge duplicates. "
+        "Runs on the current schema; use `tenant_command` or "
+        "`all_tenants_command` to run it on tenant schemas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Addresses handled per transaction')
+
+    def handle(self, *args, **options):
+        processed, merged = deduplicate_addresses(Address, CustomUser, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"[{connection.schema_name}] {processed} addresses processed, {merged} duplicates merged"
+        ))
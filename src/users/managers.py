@@ -1,5 +1,8 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from .utils import ADDRESS_FIELDS, address_hash, normalize_address
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password, tenant=None, **extra_fields):
@@ -34,4 +37,51 @@ class CustomUserManager(BaseUserManager):
             raise ValueError(_('Superuser must have is_superuser=True.'))
         
         # Tenant is optional for superusers
-        return self.create_user(email, password, tenant, **extra_fields)
\ No newline at end of file
+        return self.create_user(email, password, tenant, **extra_fields)
+
+class AddressManager(models.Manager):
+    def get_or_create_by_hash(self, **fields):
+        """
+        Return the address with the same content, creating it if needed.
+        Safe under concurrency thanks to the unique content_hash index.
+        """
+        fields = normalize_address(fields)
+        address, _ = self.get_or_create(content_hash=address_hash(fields), defaults=fields)
+        return address
+
+    def bulk_get_or_create(self, rows):
+        """
+        get_or_create_by_hash for many addresses in three queries at most.
+        Returns the addresses in the order of `rows`.
+        """
+        normalized = [normalize_address(row) for row in rows]
+        hashes = [address_hash(fields) for fields in normalized]
+        existing = self.in_bulk(set(hashes), field_name='content_hash')
+        missing = {content_hash: fields for content_hash, fields in zip(hashes, normalized)
+                   if content_hash not in existing}
+        if missing:
+            self.bulk_create(
+                [self.model(content_hash=content_hash, **fields) for content_hash, fields in missing.items()],
+                ignore_conflicts=True,
+            )
+            existing.update(self.in_bulk(list(missing), field_name='content_hash'))
+        return [existing[content_hash] for content_hash in hashes]
+
+
+    def change_for(self, address, users, **changes):
+        """
+        Copy-on-write edit of a shared address. Addresses are shared by
+        content (possibly across tenants), so instead of editing `address` in
+        place, `users` (the users whose address changes) are pointed at the
+        address with the new content, and `address` is deleted once no user
+        is left on it. Returns the address the users now use.
+        """
+        content = {field: getattr(address, field) for field in ADDRESS_FIELDS}
+        content.update(changes)
+        with transaction.atomic():
+            target = self.get_or_create_by_hash(**content)
+            if target.pk != address.pk:
+                users.filter(address=address).update(address=target, updated_at=timezone.now())
+                if not address.users.exists():
+                    address.delete()
+        return target
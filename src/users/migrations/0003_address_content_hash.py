@@ -0,0 +1,90 @@
+# Generated by Django 5.1.3 on 2026-10-19 10:05
+
+import hashlib
+
+from django.db import migrations, models, transaction
+from django.db.models import Case, When
+
+# Frozen copy of users.utils as of this migration: later changes to the live
+# hashing must not change what this migration computes.
+ADDRESS_FIELDS = ("country", "state", "city", "address_line1", "address_line2", "zip_code")
+
+
+def normalize_address(data):
+    return {field: " ".join(str(data.get(field) or "").split()) for field in ADDRESS_FIELDS}
+
+
+def address_hash(address):
+    normalized = normalize_address({field: getattr(address, field) for field in ADDRESS_FIELDS})
+    key = "\x1f".join(normalized[field].casefold() for field in ADDRESS_FIELDS)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def hash_and_deduplicate(apps, schema_editor, batch_size=1000):
+    Address = apps.get_model("users", "Address")
+    CustomUser = apps.get_model("users", "CustomUser")
+    db = schema_editor.connection.alias
+
+    last_pk = 0
+    while True:
+        batch = list(Address.objects.using(db).filter(pk__gt=last_pk).order_by("pk")[:batch_size])
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        hashes = {address.pk: address_hash(address) for address in batch}
+
+        with transaction.atomic(using=db):
+            # Rows outside the batch keep their hash and win over batch rows
+            canonical = dict(
+                Address.objects.using(db)
+                .filter(content_hash__in=set(hashes.values()))
+                .exclude(pk__in=hashes)
+                .values_list("content_hash", "pk")
+            )
+            duplicates, changed = {}, []
+            for address in batch:
+                content_hash = hashes[address.pk]
+                if content_hash in canonical:
+                    duplicates[address.pk] = canonical[content_hash]
+                    continue
+                canonical[content_hash] = address.pk
+                normalized = normalize_address({field: getattr(address, field) for field in ADDRESS_FIELDS})
+                for field, value in normalized.items():
+                    setattr(address, field, value)
+                address.content_hash = content_hash
+                changed.append(address)
+
+            if duplicates:
+                CustomUser.objects.using(db).filter(address_id__in=duplicates).update(address_id=Case(
+                    *[When(address_id=duplicate, then=target) for duplicate, target in duplicates.items()]
+                ))
+                Address.objects.using(db).filter(pk__in=duplicates).delete()
+            if changed:
+                Address.objects.using(db).bulk_update(changed, list(ADDRESS_FIELDS) + ["content_hash"])
+
+
+class Migration(migrations.Migration):
+    # Each batch of the deduplication commits on its own
+    atomic = False
+
+    dependencies = [
+        ("users", "0002_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="address",
+            name="content_hash",
+            field=models.CharField(
+                editable=False, max_length=64, null=True, verbose_name="content hash"
+            ),
+        ),
+        migrations.RunPython(hash_and_deduplicate, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="address",
+            name="content_hash",
+            field=models.CharField(
+                editable=False, max_length=64, unique=True, verbose_name="content hash"
+            ),
+        ),
+    ]
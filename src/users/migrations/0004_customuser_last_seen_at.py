@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_address_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="last_seen_at",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="last seen"
+            ),
+        ),
+    ]
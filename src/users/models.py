@@ -5,9 +5,11 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
-from .managers import CustomUserManager
+from .managers import CustomUserManager, AddressManager
+from .utils import ADDRESS_FIELDS, address_hash, normalize_address
 from django.db import transaction
 from tenants.models import Tenant
+from core.db.indexes import trigram_index
 
 class Address(models.Model):
     country = models.CharField(_('country'), max_length=100)
@@ -16,6 +18,10 @@ class Address(models.Model):
     address_line1 = models.CharField(_('address line 1'), max_length=100)
     address_line2 = models.CharField(_('address line 2'), max_length=100, blank=True)
     zip_code = models.CharField(_('ZIP/Postal code'), max_length=20)
+    content_hash = models.CharField(_('content hash'), max_length=64, unique=True, editable=False)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    objects = AddressManager()
 
     class Meta:
         verbose_name = _('address')
@@ -24,6 +30,16 @@ class Address(models.Model):
     def __str__(self):
         return f"{self.address_line1}, {self.city}, {self.country}"
 
+    def save(self, *args, **kwargs):
+        """Normalize whitespace and refresh the content hash"""
+        for field, value in normalize_address({f: getattr(self, f) for f in ADDRESS_FIELDS}).items():
+            setattr(self, field, value)
+        self.content_hash = address_hash(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'content_hash'}
+        super().save(*args, **kwargs)
+
 class CustomUser(AbstractBaseUser, PermissionsMixin):
     GENDER_CHOICES = [
         ('M', _('Male')),
@@ -60,6 +76,8 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(_('active'), default=True)
     is_staff = models.BooleanField(_('staff status'), default=False)
     date_joined = models.DateTimeField(_('date joined'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+    last_seen_at = models.DateTimeField(_('last seen'), null=True, blank=True, editable=False)
     preferred_language = models.CharField(
         _('preferred language'),
         max_length=2,
@@ -75,6 +93,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
+        # Admin search (see core.admin.TrigramSearchMixin)
+        indexes = [
+            trigram_index('email', 'user_email_trgm'),
+            trigram_index('first_name', 'user_first_name_trgm'),
+            trigram_index('last_name', 'user_last_name_trgm'),
+        ]
 
     def __str__(self):
         return self.email
@@ -1,3 +1,148 @@
-from django.test import TestCase
+from types import SimpleNamespace
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from tenants.tests import values_row
+from users.api.serializers import AddressSerializer, UserBulkUpdateSerializer, UserRowSerializer, UserSerializer
+from users.models import Address
+from users.validators import address_validator
 
-# Create your tests here.
+User = get_user_model()
+
+ADDRESS = {
+    'country': 'FR', 'state': 'Ile-de-France', 'city': 'Paris',
+    'address_line1': '1 rue de Rivoli', 'address_line2': '', 'zip_code': '75001',
+}
+
+
+class SharedAddressTests(TestCase):
+    """Addresses are shared by content, editing one user's must not touch the other's"""
+
+    def setUp(self):
+        self.address = Address.objects.get_or_create_by_hash(**ADDRESS)
+        self.alice = User.objects.create(email='alice@example.com', address=self.address)
+        self.bob = User.objects.create(email='bob@example.com', address=self.address)
+
+    def test_user_update_copies_the_address(self):
+        serializer = UserSerializer(self.alice, data={'address': {**ADDRESS, 'city': 'Lyon'}}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual(self.alice.address.city, 'Lyon')
+        self.assertNotEqual(self.alice.address_id, self.address.pk)
+        self.assertEqual(self.bob.address_id, self.address.pk)
+        self.assertEqual(self.bob.address.city, 'Paris')
+
+    def test_address_update_only_moves_the_given_users(self):
+        serializer = AddressSerializer(
+            self.address, data={'city': 'Lyon'}, partial=True,
+            context={'users': User.objects.filter(pk=self.alice.pk)},
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual(self.alice.address.city, 'Lyon')
+        self.assertEqual(self.bob.address.city, 'Paris')
+
+    def test_update_into_an_existing_address_reuses_it(self):
+        other = Address.objects.get_or_create_by_hash(**{**ADDRESS, 'city': 'Lyon'})
+        serializer = UserSerializer(self.alice, data={'address': {**ADDRESS, 'city': 'Lyon'}}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.address_id, other.pk)
+        self.assertTrue(Address.objects.filter(pk=self.address.pk).exists())
+
+    def test_last_user_leaving_deletes_the_address(self):
+        Address.objects.change_for(self.address, User.objects.all(), city='Lyon')
+        self.assertFalse(Address.objects.filter(pk=self.address.pk).exists())
+
+
+class AddressValidatorTests(SimpleTestCase):
+    def test_collects_errors_per_record(self):
+        errors = address_validator.validate_many([
+            ADDRESS,
+            {**ADDRESS, 'country': 'XX', 'zip_code': '!'},
+            {**ADDRESS, 'city': ''},
+        ])
+        self.assertEqual(sorted(errors), [1, 2])
+        self.assertEqual(sorted(errors[1]), ['country', 'zip_code'])
+        self.assertEqual(list(errors[2]), ['city'])
+
+    def test_record_checks_run_on_valid_fields(self):
+        errors = address_validator.errors({**ADDRESS, 'address_line2': ADDRESS['address_line1']})
+        self.assertEqual(list(errors), ['address_line2'])
+
+
+def target(address=None):
+    """A user as loaded by UserBulkUpdateSerializer.validate_users"""
+    return SimpleNamespace(address=address, address_id=address and 1)
+
+
+class BulkUpdateValidationTests(SimpleTestCase):
+    def validate(self, changes, targets):
+        queryset = mock.Mock()
+        queryset.select_related.return_value.in_bulk.return_value = targets
+        serializer = UserBulkUpdateSerializer(data={'users': changes}, context={'queryset': queryset})
+        serializer.is_valid()
+        return serializer.errors
+
+    def test_address_errors_are_reported_per_change(self):
+        targets = {1: target(Address(**ADDRESS)), 2: target(), 3: target(Address(**ADDRESS))}
+        errors = self.validate([
+            {'id': 1, 'address': {'city': 'Lyon'}},
+            {'id': 2, 'address': {'city': 'Lyon'}},
+            {'id': 3, 'address': {'zip_code': '!'}},
+        ], targets)
+        self.assertEqual(errors['users'][0], {})
+        # No current address to complete: every other required field is missing
+        self.assertEqual(sorted(errors['users'][1]['address']), ['address_line1', 'country', 'state', 'zip_code'])
+        self.assertEqual(list(errors['users'][2]['address']), ['zip_code'])
+
+    def test_valid_changes_pass(self):
+        targets = {1: target(Address(**ADDRESS)), 2: target()}
+        errors = self.validate([
+            {'id': 1, 'address': {'city': 'Lyon'}},
+            {'id': 2, 'address': ADDRESS, 'is_active': False},
+        ], targets)
+        self.assertEqual(errors, {})
+
+    def test_same_rules_as_single_updates(self):
+        # Stored before the rules existed: only the submitted fields are checked
+        address = Address(pk=1, **{**ADDRESS, 'country': 'France'})
+        for change, expected in (({'zip_code': '75002'}, {}), ({'zip_code': '!', 'city': 'L'}, ['city', 'zip_code'])):
+            with self.subTest(change=change):
+                errors = self.validate([{'id': 1, 'address': change}], {1: target(address)})
+                serializer = UserSerializer(User(pk=1, address=address), data={'address': change}, partial=True)
+                serializer.is_valid()
+                if expected:
+                    self.assertEqual(errors['users'][0]['address'], serializer.errors['address'])
+                    self.assertEqual(sorted(serializer.errors['address']), expected)
+                else:
+                    self.assertEqual((errors, serializer.errors), ({}, {}))
+
+    def test_user_without_address_needs_a_complete_one(self):
+        errors = self.validate([{'id': 1, 'address': {'city': 'Lyon'}}], {1: target()})
+        serializer = UserSerializer(User(pk=1), data={'address': {'city': 'Lyon'}}, partial=True)
+        serializer.is_valid()
+        self.assertEqual(errors['users'][0]['address'], serializer.errors['address'])
+
+
+class UserRowSerializerParityTests(SimpleTestCase):
+    def assertSameOutput(self, user):
+        rows = UserRowSerializer().serialize([values_row(user, UserRowSerializer.fields)])
+        self.assertEqual(rows, [UserSerializer(user).data])
+
+    def test_user_with_address(self):
+        self.assertSameOutput(User(
+            pk=1, email='alice@example.com', first_name='Alice', last_name='Martin',
+            phone_number='+33123456789', gender='F', address=Address(pk=1, **ADDRESS),
+        ))
+
+    def test_user_without_address(self):
+        self.assertSameOutput(User(pk=2, email='bob@example.com', first_name='Bob'))
@@ -0,0 +1,71 @@
+import hashlib
+from django.db import transaction
+from django.db.models import Case, When
+
+ADDRESS_FIELDS = ('country', 'state', 'city', 'address_line1', 'address_line2', 'zip_code')
+
+
+def normalize_address(data):
+    """Address fields with surrounding and repeated whitespace removed"""
+    return {field: ' '.join(str(data.get(field) or '').split()) for field in ADDRESS_FIELDS}
+
+
+def address_hash(data):
+    """Case-insensitive content hash of an address (dict or Address instance)"""
+    if not isinstance(data, dict):
+        data = {field: getattr(data, field) for field in ADDRESS_FIELDS}
+    normalized = normalize_address(data)
+    key = '\x1f'.join(normalized[field].casefold() for field in ADDRESS_FIELDS)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def deduplicate_addresses(address_model, user_model, batch_size=1000):
+    """
+    Normalize and hash every address, merging duplicates into the first row
+    with the same content. Works in pk-ordered batches, one transaction each.
+    Model classes are parameters so migrations can pass historical models.
+
+    Returns (addresses processed, duplicates merged).
+    """
+    processed = merged = 0
+    last_pk = 0
+    while True:
+        batch = list(address_model.objects.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not batch:
+            return processed, merged
+        last_pk = batch[-1].pk
+        hashes = {address.pk: address_hash(address) for address in batch}
+
+        with transaction.atomic():
+            # Rows outside the batch keep their hash and win over batch rows
+            canonical = dict(
+                address_model.objects.filter(content_hash__in=set(hashes.values()))
+                .exclude(pk__in=hashes)
+                .values_list('content_hash', 'pk')
+            )
+            duplicates, changed = {}, []
+            for address in batch:
+                content_hash = hashes[address.pk]
+                if content_hash in canonical:
+                    duplicates[address.pk] = canonical[content_hash]
+                    continue
+                canonical[content_hash] = address.pk
+                normalized = normalize_address({field: getattr(address, field) for field in ADDRESS_FIELDS})
+                if address.content_hash != content_hash or any(
+                    getattr(address, field) != value for field, value in normalized.items()
+                ):
+                    for field, value in normalized.items():
+                        setattr(address, field, value)
+                    address.content_hash = content_hash
+                    changed.append(address)
+
+            if duplicates:
+                user_model.objects.filter(address_id__in=duplicates).update(address_id=Case(
+                    *[When(address_id=duplicate, then=target) for duplicate, target in duplicates.items()]
+                ))
+                address_model.objects.filter(pk__in=duplicates).delete()
+            if changed:
+                address_model.objects.bulk_update(changed, list(ADDRESS_FIELDS) + ['content_hash'])
+
+        processed += len(batch)
+        merged += len(duplicates)
@@ -1,190 +1,162 @@
+"""
+Validation rules for user and address data.
+
+Every rule is a precompiled check plus a message, usable two ways:
+- as a regular Django validator (`validate_zip_code`, `validate_name`, ...)
+- through RecordValidator, which validates plain dicts in bulk without
+  instantiating models or raising exceptions per field. address_validator
+  holds the address rules of both single and bulk updates (see
+  users.api.serializers).
+"""
 import re
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
+from django.utils.functional import lazy
 from django.utils.translation import gettext_lazy as _
-from django.core.exceptions import ValidationError
-from django.db import models
-from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 
-# Phone number validator
-phone_regex = RegexValidator(
-    regex=r'^\+?1?\d{9,15}$',
-    message=_("Phone number must be entered in the format: '+999999999'. Up to 15 digits allowed.")
-)
+PHONE_PATTERN = re.compile(r'^\+?1?\d{9,15}$')
+ZIP_CODE_PATTERN = re.compile(r'^[A-Z0-9]{3,10}(-[A-Z0-9]{4})?$', re.I)
+NAME_FORBIDDEN_PATTERN = re.compile(r'[0-9!@#$%^&*(),.?":{}|<>]')
+
+# ISO 3166-1 alpha-2
+COUNTRY_CODES = frozenset((
+    'AD', 'AE', 'AF', 'AG', 'AI', 'AL', 'AM', 'AO', 'AQ', 'AR', 'AS', 'AT', 'AU',
+    'AW', 'AX', 'AZ', 'BA', 'BB', 'BD', 'BE', 'BF', 'BG', 'BH', 'BI', 'BJ', 'BL',
+    'BM', 'BN', 'BO', 'BQ', 'BR', 'BS', 'BT', 'BV', 'BW', 'BY', 'BZ', 'CA', 'CC',
+    'CD', 'CF', 'CG', 'CH', 'CI', 'CK', 'CL', 'CM', 'CN', 'CO', 'CR', 'CU', 'CV',
+    'CW', 'CX', 'CY', 'CZ', 'DE', 'DJ', 'DK', 'DM', 'DO', 'DZ', 'EC', 'EE', 'EG',
+    'EH', 'ER', 'ES', 'ET', 'FI', 'FJ', 'FK', 'FM', 'FO', 'FR', 'GA', 'GB', 'GD',
+    'GE', 'GF', 'GG', 'GH', 'GI', 'GL', 'GM', 'GN', 'GP', 'GQ', 'GR', 'GS', 'GT',
+    'GU', 'GW', 'GY', 'HK', 'HM', 'HN', 'HR', 'HT', 'HU', 'ID', 'IE', 'IL', 'IM',
+    'IN', 'IO', 'IQ', 'IR', 'IS', 'IT', 'JE', 'JM', 'JO', 'JP', 'KE', 'KG', 'KH',
+    'KI', 'KM', 'KN', 'KP', 'KR', 'KW', 'KY', 'KZ', 'LA', 'LB', 'LC', 'LI', 'LK',
+    'LR', 'LS', 'LT', 'LU', 'LV', 'LY', 'MA', 'MC', 'MD', 'ME', 'MF', 'MG', 'MH',
+    'MK', 'ML', 'MM', 'MN', 'MO', 'MP', 'MQ', 'MR', 'MS', 'MT', 'MU', 'MV', 'MW',
+    'MX', 'MY', 'MZ', 'NA', 'NC', 'NE', 'NF', 'NG', 'NI', 'NL', 'NO', 'NP', 'NR',
+    'NU', 'NZ', 'OM', 'PA', 'PE', 'PF', 'PG', 'PH', 'PK', 'PL', 'PM', 'PN', 'PR',
+    'PS', 'PT', 'PW', 'PY', 'QA', 'RE', 'RO', 'RS', 'RU', 'RW', 'SA', 'SB', 'SC',
+    'SD', 'SE', 'SG', 'SH', 'SI', 'SJ', 'SK', 'SL', 'SM', 'SN', 'SO', 'SR', 'SS',
+    'ST', 'SV', 'SX', 'SY', 'SZ', 'TC', 'TD', 'TF', 'TG', 'TH', 'TJ', 'TK', 'TL',
+    'TM', 'TN', 'TO', 'TR', 'TT', 'TV', 'TW', 'TZ', 'UA', 'UG', 'UM', 'US', 'UY',
+    'UZ', 'VA', 'VC', 'VE', 'VG', 'VI', 'VN', 'VU', 'WF', 'WS', 'YE', 'YT', 'ZA',
+    'ZM', 'ZW',
+))
+
+PHONE_MESSAGE = _("Phone number must be entered in the format: '+999999999'. Up to 15 digits allowed.")
+ZIP_CODE_MESSAGE = _('Invalid postal code format.')
+NAME_MESSAGE = _('Name cannot contain numbers or special characters.')
+COUNTRY_MESSAGE = _('Invalid country code.')
+
+class Rule:
+    """A precompiled check: `check(value)` returns True when the value is valid"""
+    __slots__ = ('check', 'message')
+
+    def __init__(self, check, message):
+        self.check = check
+        self.message = message
+
+    def __call__(self, value):
+        """Django validator interface"""
+        if not self.check(value):
+            raise ValidationError(self.message)
+
+
+def _interpolate(message, params):
+    return message % params
+
+
+_interpolate_lazy = lazy(_interpolate, str)
+
+
+def min_length(limit):
+    message = _interpolate_lazy(_('Ensure this value has at least %(limit_value)d characters.'), {'limit_value': limit})
+    return Rule(lambda value: len(value) >= limit, message)
+
+
+zip_code_rule = Rule(lambda value: ZIP_CODE_PATTERN.match(value) is not None, ZIP_CODE_MESSAGE)
+name_rule = Rule(lambda value: NAME_FORBIDDEN_PATTERN.search(value) is None, NAME_MESSAGE)
+country_rule = Rule(COUNTRY_CODES.__contains__, COUNTRY_MESSAGE)
+
+# Django validators (plain functions so model fields can reference them in migrations)
+phone_regex = RegexValidator(regex=PHONE_PATTERN, message=PHONE_MESSAGE)
+
 
-# ZIP/Postal code validator
 def validate_zip_code(value):
-    # Basic pattern that works for most countries
-    if not re.match(r'^[A-Z0-9]{3,10}(-[A-Z0-9]{4})?$', value, re.I):
-        raise ValidationError(
-            _('Invalid postal code format.')
-        )
+    zip_code_rule(value)
+
 
-# Name validator
 def validate_name(value):
-    if re.search(r'[0-9!@#$%^&*(),.?":{}|<>]', value):
-        raise ValidationError(
-            _('Name cannot contain numbers or special characters.')
-        )
+    name_rule(value)
+
 
-# Country validator
 def validate_country(value):
-    # Add your list of valid countries or use django-countries
-    valid_countries = ['US', 'FR', 'GB']  # Example list
-    if value not in valid_countries:
-        raise ValidationError(
-            _('Invalid country code.')
-        )
-
-# Updated models with validations
-# src/users/models.py
-from django.core.validators import EmailValidator, MinLengthValidator
-from .validators import (
-    phone_regex, validate_zip_code, validate_name, validate_country
-)
-
-class Address(models.Model):
-    country = models.CharField(
-        _('country'), 
-        max_length=100,
-        validators=[validate_country]
-    )
-    state = models.CharField(
-        _('state/province'), 
-        max_length=100,
-        validators=[MinLengthValidator(2)]
-    )
-    city = models.CharField(
-        _('city'), 
-        max_length=100,
-        validators=[MinLengthValidator(2)]
-    )
-    address_line1 = models.CharField(
-        _('address line 1'), 
-        max_length=100,
-        validators=[MinLengthValidator(5)]
-    )
-    address_line2 = models.CharField(
-        _('address line 2'), 
-        max_length=100, 
-        blank=True
-    )
-    zip_code = models.CharField(
-        _('ZIP/Postal code'), 
-        max_length=20,
-        validators=[validate_zip_code]
-    )
-
-    def clean(self):
-        # Custom model validation
-        if self.address_line2 and self.address_line2 == self.address_line1:
-            raise ValidationError({
-                'address_line2': _('Address line 2 cannot be the same as Address line 1')
-            })
-
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
-
-class CustomUser(AbstractBaseUser, PermissionsMixin):
-    GENDER_CHOICES = [
-        ('M', _('Male')),
-        ('F', _('Female')),
-        ('O', _('Other'))
-    ]
-
-    email = models.EmailField(
-        _('email address'), 
-        unique=True,
-        validators=[EmailValidator()]
-    )
-    first_name = models.CharField(
-        _('first name'), 
-        max_length=50,
-        validators=[validate_name, MinLengthValidator(2)]
-    )
-    last_name = models.CharField(
-        _('last name'), 
-        max_length=50,
-        validators=[validate_name, MinLengthValidator(2)]
-    )
-    phone_number = models.CharField(
-        _('phone number'), 
-        max_length=20,
-        validators=[phone_regex],
-        blank=True, 
-        null=True
-    )
-    sex = models.CharField(
-        _('sex'), 
-        max_length=1, 
-        choices=GENDER_CHOICES,
-        null=True
-    )
-    address = models.OneToOneField(
-        Address, 
-        on_delete=models.SET_NULL, 
-        null=True, 
-        blank=True
-    )
-    # ... rest of the model remains the same ...
-
-    def clean(self):
-        super().clean()
-        # Custom validation for the user model
-        if self.phone_number and not self.phone_number.startswith('+'):
-            raise ValidationError({
-                'phone_number': _('Phone number must start with "+"')
-            })
-
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
-
-# src/users/serializers.py
-from rest_framework import serializers
-from django.core.exceptions import ValidationError
-from .models import CustomUser, Address
-
-class AddressSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Address
-        fields = '__all__'
-
-    def validate_zip_code(self, value):
-        # Additional serializer-level validation
-        if value.isalpha():
-            raise serializers.ValidationError(
-                _('ZIP code cannot contain only letters.')
-            )
-        return value
-
-class UserSerializer(serializers.ModelSerializer):
-    address = AddressSerializer(required=False)
-
-    class Meta:
-        model = CustomUser
-        fields = [
-            'id', 'email', 'first_name', 'last_name',
-            'phone_number', 'sex', 'address', 'preferred_language'
-        ]
-        extra_kwargs = {
-            'password': {'write_only': True},
-            'email': {'required': True},
-            'first_name': {'required': True},
-            'last_name': {'required': True},
-        }
-
-    def validate(self, data):
-        # Cross-field validation
-        if data.get('first_name') == data.get('last_name'):
-            raise serializers.ValidationError(
-                _('First name and last name cannot be the same.')
-            )
-        return data
-
-    def validate_phone_number(self, value):
-        if value and not value.startswith('+'):
-            raise serializers.ValidationError(
-                _('Phone number must start with "+"')
-            )
-        return value
\ No newline at end of file
+    country_rule(value)
+
+
+class RecordValidator:
+    """
+    Validates dict records against per-field rules and record-level checks.
+
+    `fields` maps a field name to (required, rules); `checks` are callables
+    taking the record and returning a {field: message} dict (or None).
+    Blank optional values skip their rules, like Django's blank fields.
+    With `partial`, fields missing from the record are not validated (nor
+    required), like DRF partial updates.
+    """
+
+    def __init__(self, fields, checks=()):
+        self.fields = [(name, required, tuple(rules)) for name, (required, rules) in fields.items()]
+        self.checks = tuple(checks)
+
+    def errors(self, record, partial=False):
+        """{field: [messages]} for one record, empty when valid"""
+        errors = {}
+        for name, required, rules in self.fields:
+            if partial and name not in record:
+                continue
+            value = record.get(name)
+            if value is None or value == '':
+                if required:
+                    errors[name] = [_('This field is required.')]
+                continue
+            failed = [rule.message for rule in rules if not rule.check(value)]
+            if failed:
+                errors[name] = failed
+        if not errors:
+            for check in self.checks:
+                for name, message in (check(record) or {}).items():
+                    errors.setdefault(name, []).append(message)
+        return errors
+
+    def validate_many(self, records, partial=False):
+        """{index: errors} for the invalid records of an iterable"""
+        errors = self.errors
+        result = {}
+        for index, record in enumerate(records):
+            record_errors = errors(record, partial)
+            if record_errors:
+                result[index] = record_errors
+        return result
+
+    def validate(self, record, partial=False):
+        """Raise a ValidationError with the errors of one record"""
+        errors = self.errors(record, partial)
+        if errors:
+            raise ValidationError(errors)
+
+
+def _distinct_address_lines(record):
+    line2 = record.get('address_line2')
+    if line2 and line2 == record.get('address_line1'):
+        return {'address_line2': _('Address line 2 cannot be the same as Address line 1')}
+    return None
+
+
+address_validator = RecordValidator({
+    'country': (True, [country_rule]),
+    'state': (True, [min_length(2)]),
+    'city': (True, [min_length(2)]),
+    'address_line1': (True, [min_length(5)]),
+    'address_line2': (False, []),
+    'zip_code': (True, [zip_code_rule]),
+}, checks=[_distinct_address_lines])